@@ -0,0 +1,15 @@
+# One aggregation pass per filter state: the selected members of every user set
+# are gathered once from the rollup and reused for the KPI row and all the
+# per-dimension and top-user tables, so every distinct count on the page comes
+# from the same selection.
+TABLE_DIMENSIONS = ['wilayah', 'title', 'category_name']
+TOP_USERS = 10
+
+
+def aggregate(rollup, mask, dimensions=TABLE_DIMENSIONS, top_users=TOP_USERS):
+    selected = rollup.selected_members(mask)
+    result = {'kpis': rollup.kpis(mask, selected)}
+    for dim in dimensions:
+        result[dim] = rollup.by(mask, dim, selected)
+    result['top_users'] = rollup.top_users(mask, top_users, selected)
+    return result
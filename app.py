@@ -1,7 +1,19 @@
-import pandas as pd
 import streamlit as st
 import plotly.express as px
-from data_processing import finalize_data
+from data_processing import (
+    finalize_data, get_refresher, get_memo,
+    current_snapshot, current_credentials, current_filter_engine, current_rollup, current_timeseries, current_ledger,
+)
+from credentials import COOKIE
+from programmes import DEFAULT_PROGRAMME, get_programmes
+from table_view import paginated_table
+import instrumentation
+from memo import filter_key
+from rollups import build_rollup
+from timeseries import build_timeseries
+from aggregations import aggregate
+from export import FORMATS, USER_PROGRESS_COLUMNS, export_bytes, user_progress_rows
+import numpy as np
 from datetime import datetime
 import os
 from oauth2client.service_account import ServiceAccountCredentials
@@ -9,43 +21,81 @@ import gspread
 import textwrap
 import streamlit_authenticator as stauth
 
+# Trend chart options: metric -> (time-series metric, axis label, unit); period -> (frequency, axis label)
+TREND_METRICS = {
+    'Jumlah Penggunaan': ('price', 'Total Jumlah Penggunaan', 'IDR'),
+    'Enrollments': ('enrollments', 'Total Enrollments', 'transactions'),
+    'Completions': ('completions', 'Total Completions', 'courses at 100%'),
+    'Learning Hours': ('hours', 'Total Learning Hours', 'hours'),
+}
+TREND_PERIODS = {
+    'Weekly': ('W', "Week (YYYY-MM-W)"),
+    'Monthly': ('M', "Month (YYYY-MM)"),
+    'Daily': ('D', "Day (YYYY-MM-DD)"),
+}
+# A name search builds its own rollup and time series from the matching rows; past
+# this many rows that rebuild is too slow for a page view, so broader searches only
+# filter the tables and the KPIs and charts keep to the sidebar filters
+NAME_AGGREGATE_MAX_ROWS = 250000
+
 #####################################PAGE#################
 st.set_page_config(layout="wide")
-st.title("Kognisi x BPJS")
+
+# Programme (partner) being viewed; ?programme=<key> links straight to one
+programmes = get_programmes()
+programme_keys = list(programmes)
+requested = st.query_params.get('programme')
+if len(programmes) > 1:
+    programme_key = st.selectbox(
+        "Programme",
+        options=programme_keys,
+        index=programme_keys.index(requested) if requested in programmes else 0,
+        format_func=lambda key: programmes[key].name,
+        key='programme',
+    )
+else:
+    programme_key = programme_keys[0]
+programme = programmes[programme_key]
+
+st.title(programme.name)
 st.markdown("""
 Welcome!
 """)
 
-df_combined, df_creds = finalize_data()
+snapshot = current_snapshot(programme.key)
+df_combined, df_creds = finalize_data(snapshot, programme.key)
+
+data_age = get_refresher(programme.key).age()
+if data_age is not None:
+    st.caption(f"Data refreshed {int(data_age.total_seconds() // 60)} minutes ago.")
 
 ####################################CREDS##################
-def extract_credentials(df_creds):
-    credentials = {
-        "credentials": {
-            "usernames": {}
-        },
-        "cookie": {
-            "name": "growth_center",
-            "key": "growth_2024",
-            "expiry_days": 30
-        }
-    }
-    for index, row in df_creds.iterrows():
-        credentials['credentials']['usernames'][row['username']] = {
-            'name': row['username'],
-            'password': row['password'],  # Password should already be hashed
-            'email': row['email'],  # Add the email field
-        }
-    return credentials
-# Extract credentials from df_creds
-credentials = extract_credentials(df_creds)
-
-# Authentication Setup
+def get_session_credentials(snapshot, programme):
+    # The precompiled creds, copied into the session once per creds version; the
+    # authenticator keeps this session's login state in the copy
+    store = current_credentials(snapshot, programme.key)
+    version = (programme.key, store.version)
+    cached = st.session_state.get('session_credentials')
+    if cached is None or cached[0] != version:
+        st.session_state['session_credentials'] = cached = (version, store.session_credentials())
+    return cached[1]
+
+# A login only holds for the programme it was made in
+if st.session_state.get('authenticated_programme') not in (None, programme.key):
+    for state_key in ('authentication_status', 'username', 'name', 'logged_in'):
+        st.session_state.pop(state_key, None)
+    st.session_state.pop('authenticated_programme')
+
+# Authentication Setup. The authenticator is built on every rerun: its cookie manager
+# only reads the browser cookies when constructed, and that read is empty on a
+# session's first run. Each partner's users log in against that programme's creds,
+# with their own cookie.
+cookie_name = COOKIE['name'] if programme.key == DEFAULT_PROGRAMME.key else f"{COOKIE['name']}_{programme.key}"
 authenticator = stauth.Authenticate(
-    credentials['credentials'],
-    credentials['cookie']['name'],
-    credentials['cookie']['key'],
-    credentials['cookie']['expiry_days'],
+    get_session_credentials(snapshot, programme),
+    cookie_name,
+    COOKIE['key'],
+    COOKIE['expiry_days'],
     auto_hash=False
 )
 
@@ -53,6 +103,7 @@ authenticator.login('main')
 
 if st.session_state.get('authentication_status'):
     st.session_state['logged_in'] = True  # Set session state for logged in
+    st.session_state['authenticated_programme'] = programme.key
     st.success("Logged in successfully!")
 
 
@@ -61,11 +112,12 @@ if st.session_state.get('authentication_status'):
     
     voucher_filter = st.sidebar.selectbox(
         "Filter by Voucher Type",
-        options=["All", "KOGNISIXBPJSTK", "KOGNISIXBPJSKACAB"],
+        options=["All"] + list(programme.voucher_options),
         index=0,  # Default to "All"
     )
     
-    name_filter = st.sidebar.text_input("Search by Name")
+    # Normalized once; the memo key, the filter engine and the name-search branches all use this value
+    name_filter = st.sidebar.text_input("Search by Name").strip().lower()
 
     date_range = st.sidebar.date_input(
         "Filter by Date Range",
@@ -88,33 +140,74 @@ if st.session_state.get('authentication_status'):
     )
 
     # Apply Filters
-    filtered_df = df_combined.copy()
-
-    if name_filter:
-        filtered_df = filtered_df[filtered_df['nama'].str.contains(name_filter, case=False, na=False)]
-
-    if date_range and isinstance(date_range, tuple) and len(date_range) == 2:
-        start_date, end_date = date_range
-        if 'enroll_date' in df_combined.columns:
-            filtered_df = filtered_df[
-                (filtered_df['enroll_date'].isnull()) |  # Include rows where 'enroll_date' is null
-                (
-                    (pd.to_datetime(filtered_df['enroll_date'], errors='coerce') >= pd.to_datetime(start_date)) &
-                    (pd.to_datetime(filtered_df['enroll_date'], errors='coerce') <= pd.to_datetime(end_date))
-                )
-            ]
+    date_filter = date_range if isinstance(date_range, tuple) and len(date_range) == 2 else None
+
+    # Derived results are shared across sessions, keyed by snapshot version, filter state and view
+    memo = get_memo(programme.key)
+    memo_key = (
+        programme.key,
+        snapshot.version if snapshot is not None else None,
+        filter_key(name_filter, date_filter, wilayah_filter, category_filter, voucher_filter),
+    )
+
+    def cached(view, compute):
+        def timed():
+            with instrumentation.span(f"view.{view[0] if isinstance(view, tuple) else view}"):
+                return compute()
+        return memo.get_or_compute(memo_key + (view,), timed)
+
+    filter_rows = cached('rows', lambda: current_filter_engine(snapshot, programme.key).select(
+        name=name_filter,
+        date_range=date_filter,
+        wilayah=wilayah_filter,
+        categories=category_filter,
+        voucher=voucher_filter,
+    ))
+    # Everything below works from these row positions; only a name search takes
+    # the matching rows out of the snapshot, for the rollup and time series built from them
+    def name_rows_df():
+        return cached('name_rows_df', lambda: df_combined.take(filter_rows))
+
+    name_aggregates = bool(name_filter) and len(filter_rows) <= NAME_AGGREGATE_MAX_ROWS
+    if name_filter and not name_aggregates:
+        st.info(
+            f"The name search matches {len(filter_rows):,} rows, so it only filters the tables; "
+            "the KPIs and charts use the sidebar filters only. Refine the search to apply it to them too."
+        )
 
-    if wilayah_filter:
-        filtered_df = filtered_df[filtered_df['wilayah'].isin(wilayah_filter)]
+    # Aggregates are answered from the pre-built rollup; a name search needs row-level
+    # data, so in that case a rollup is built from the matching rows only. Those rows
+    # are already date-filtered, so it leaves out the day grain. The memo holds what
+    # is built for this filter state, not the snapshot's shared rollup
+    def select_rollup():
+        if name_aggregates:
+            rollup = cached('name_rollup', lambda: build_rollup(name_rows_df(), by_day=False))
+            return rollup, np.ones(len(rollup.cube), dtype=bool)
+        rollup = current_rollup(snapshot, programme.key)
+        return rollup, cached('rollup_selection', lambda: rollup.select(date_filter, wilayah_filter, category_filter, voucher_filter))
+
+    rollup, selection = select_rollup()
+    # KPI row and the wilayah/title/category/top-user tables in one pass over the selection
+    aggregates = cached('aggregates', lambda: aggregate(rollup, selection))
+    kpis = aggregates['kpis']
+
+    def build_wilayah_adoption():
+        # Distinct users, enrolled users and users with 100% progress per wilayah
+        wilayah_adoption = (
+            aggregates['wilayah'][['users', 'enrolled', 'completed']]
+            .reset_index()
+            .rename(columns={'users': 'user', 'enrolled': 'enrollment', 'completed': 'progress_100%'})
+        )
+
+        # Calculate learning_adoption
+        wilayah_adoption['learning_adoption'] = (
+            wilayah_adoption['enrollment'] / wilayah_adoption['user']
+        ).round(2)
+        return wilayah_adoption.sort_values(by='user', ascending=False)
 
-    if category_filter:
-        filtered_df = filtered_df[filtered_df['category_name'].isin(category_filter)]
-    if voucher_filter != "All":
-        filtered_df = filtered_df[filtered_df['voucher'] == voucher_filter]
     # Display Filtered Data
     st.write("#### **Filtered Data**:")
-    with st.expander("View Filtered Data"):
-        st.write(filtered_df)
+    paginated_table("View Filtered Data", df_combined, key='filtered_data', rows=lambda: filter_rows, cached=cached)
 
     #######################################VISUAL#################
     col3, col4, col5, col8, col9 = st.columns(5)
@@ -122,12 +215,12 @@ if st.session_state.get('authentication_status'):
 
     # Column 3: Count distinct emails as 'Jumlah User'
     with col3:
-        jumlah_user = filtered_df['email'].nunique()  # Count distinct emails
+        jumlah_user = kpis['users']  # Count distinct emails
         st.metric("Jumlah Karyawan", jumlah_user)
 
     # Column 4: Count distinct emails where 'no_transaksi' is not null as 'Enroll User'
     with col4:
-        enroll_user = filtered_df[filtered_df['no_transaksi'].notnull()]['email'].nunique()
+        enroll_user = kpis['enrolled']
         st.metric("Enroll User", enroll_user)
 
     # Column 5: Percentage of enrollment
@@ -135,301 +228,252 @@ if st.session_state.get('authentication_status'):
         enrollment_percentage = (enroll_user / jumlah_user * 100) if jumlah_user > 0 else 0
         st.metric("Enrollment (%)", f"{enrollment_percentage:.2f}%")
 
-    # Column 6: Sum of 'price' as 'Jumlah Penggunaan' (use unfiltered df_combined)
+    # Budget figures come from the programme's ledger, which counts every transaction once
+    ledger = current_ledger(snapshot, programme.key)
+
+    # Column 6: Total of all transactions as 'Jumlah Penggunaan' (unfiltered)
     with col6:
-        jumlah_penggunaan = df_combined['price'].sum() if 'price' in df_combined.columns else 0
+        jumlah_penggunaan = ledger['usage']
         st.metric("Jumlah Penggunaan", f"Rp {jumlah_penggunaan:,.0f}")
 
-    # Column 7: Remaining balance as 'Sisa Saldo' (calculate from unfiltered data)
+    # Column 7: Remaining balance as 'Sisa Saldo', with the burn rate and projected run-out
     with col7:
-        initial_balance = 94572100
-        sisa_saldo = initial_balance - jumlah_penggunaan
+        sisa_saldo = ledger['remaining']
         st.metric("Sisa Saldo", f"Rp {sisa_saldo:,.0f}")
+        burn_rate = ledger['burn_rate']
+        st.caption(
+            f"Burn rate (last {ledger['burn_window_days']} days): Rp {burn_rate['day']:,.0f}/day, "
+            f"Rp {burn_rate['week']:,.0f}/week, Rp {burn_rate['month']:,.0f}/month"
+        )
+        if sisa_saldo <= 0:
+            st.caption("Budget exhausted")
+        elif ledger['run_out_date'] is not None:
+            st.caption(f"Projected run-out: {ledger['run_out_date']:%d %b %Y}")
+        else:
+            st.caption("Projected run-out: no recent usage")
 
     # Column 8: Average of 'progress' as 'Avg Progress'
     with col8:
-        avg_progress = filtered_df['progress'].mean() if 'progress' in filtered_df.columns else 0
+        avg_progress = kpis['avg_progress'] if 'progress' in df_combined.columns else 0
         st.metric("Avg Progress", f"{avg_progress:.2f}%")
 
     # Column 9: Sum of 'duration' converted from seconds to hours as 'Total Duration'
     with col9:
-        total_duration_sec = filtered_df['duration'].sum() if 'duration' in filtered_df.columns else 0
+        total_duration_sec = kpis['duration'] if 'duration' in df_combined.columns else 0
         total_duration_hours = total_duration_sec / 3600  # Convert seconds to hours
         st.metric("Total Duration (hours)", f"{total_duration_hours:,.2f}")
 
     # Column 10: Count vouchers that have been redeemed as 'Jumlah Voucher Redeemed'
     with col10:
-        jumlah_voucher_redeemed = filtered_df['voucher'].count()
+        jumlah_voucher_redeemed = kpis['vouchers']
         st.metric("Jumlah Voucher Redeemed", jumlah_voucher_redeemed)
 
     st.divider()
 
     ##### TRENDLINE
-    # Ensure 'enroll_date' is datetime
-    if 'enroll_date' in filtered_df.columns and 'price' in filtered_df.columns:
-        filtered_df['enroll_date'] = pd.to_datetime(filtered_df['enroll_date'], errors='coerce')
-        
-        # Select box for Weekly or Monthly trend
-        trend_type = st.selectbox("Select Trend Type", options=['Weekly', 'Monthly'], index=0)
-        
-        # Group by Week or Month based on selection
-        if trend_type == 'Weekly':
+    if 'enroll_date' in df_combined.columns and 'price' in df_combined.columns:
+        # Select box for the trend period and the metric to plot
+        trend_type = st.selectbox("Select Trend Type", options=['Weekly', 'Monthly', 'Daily'], index=0)
+        trend_metric = st.selectbox("Select Trend Metric", options=list(TREND_METRICS), index=0)
+
+        # Trends are read from the snapshot's daily time series; like the rollup, a
+        # name search gets a series built from the matching rows only
+        def select_timeseries():
+            if name_aggregates:
+                timeseries = cached('name_timeseries', lambda: build_timeseries(name_rows_df()))
+                return timeseries, np.ones(len(timeseries.groups), dtype=bool), None
+            timeseries = current_timeseries(snapshot, programme.key)
+            return timeseries, cached('timeseries_selection', lambda: timeseries.select(wilayah_filter, category_filter, voucher_filter)), date_filter
+
+        def build_trend_figure():
+            timeseries, groups, date_span = select_timeseries()
+            metric, y_label, unit = TREND_METRICS[trend_metric]
+            freq, x_label = TREND_PERIODS[trend_type]
             trend_data = (
-                filtered_df.groupby(filtered_df['enroll_date'].dt.to_period('W'))['price']
-                .sum()
+                timeseries.series([metric], groups, freq, date_span)
                 .reset_index()
-                .rename(columns={'enroll_date': 'Period', 'price': 'Total Jumlah Penggunaan'})
+                .rename(columns={metric: y_label})
             )
             trend_data['Period'] = trend_data['Period'].astype(str)  # Convert to string for display
-            title = "Trend of Jumlah Penggunaan (Weekly)"
-            x_label = "Week (YYYY-MM-W)"
-        else:  # Monthly trend
-            trend_data = (
-                filtered_df.groupby(filtered_df['enroll_date'].dt.to_period('M'))['price']
-                .sum()
-                .reset_index()
-                .rename(columns={'enroll_date': 'Period', 'price': 'Total Jumlah Penggunaan'})
-            )
-            trend_data['Period'] = trend_data['Period'].astype(str)  # Convert to string for display
-            title = "Trend of Jumlah Penggunaan (Monthly)"
-            x_label = "Month (YYYY-MM)"
-        
-        # Format 'Total Jumlah Penggunaan' for display
-        def format_price(value):
-            if value >= 1_000_000:
-                return f"{value / 1_000_000:.1f} juta"
-            elif value >= 1_000:
-                return f"{value / 1_000:.1f} ribu"
+            title = f"Trend of {trend_metric} ({trend_type})"
+
+            # Format the values for display
+            values = trend_data[y_label].to_numpy(dtype=float)
+            if metric == 'price':
+                trend_data[f'Formatted {trend_metric}'] = np.select(
+                    [values >= 1_000_000, values >= 1_000],
+                    [np.char.add(np.char.mod('%.1f', values / 1_000_000), ' juta'),
+                     np.char.add(np.char.mod('%.1f', values / 1_000), ' ribu')],
+                    np.char.mod('%.0f', values),
+                )
             else:
-                return f"{value:.0f}"
-
-        trend_data['Formatted Jumlah Penggunaan'] = trend_data['Total Jumlah Penggunaan'].apply(format_price)
-        
-        # Create the trendline chart
-        fig = px.line(
-            trend_data,
-            x='Period',  # X-axis: Week or Month
-            y='Total Jumlah Penggunaan',  # Y-axis: Total Jumlah Penggunaan
-            title=title,
-            markers=True,
-            labels={'Period': x_label, 'Total Jumlah Penggunaan': 'Total Jumlah Penggunaan (IDR)'},
-            text='Formatted Jumlah Penggunaan',
-            hover_data={'Total Jumlah Penggunaan': True, 'Formatted Jumlah Penggunaan': True},
-        )
-        fig.update_traces(
-            line=dict(color='green', width=2), 
-            marker=dict(size=8), 
-            textposition='top center'
-        )
-        fig.update_layout(
-            xaxis_title=x_label,
-            yaxis_title="Total Jumlah Penggunaan (IDR)",
-            hovermode="x unified",
-            template="plotly_white",
-            width=1200,
-            height=500,
-        )
-        
+                trend_data[f'Formatted {trend_metric}'] = np.char.mod('%.1f' if metric == 'hours' else '%.0f', values)
+
+            # Create the trendline chart
+            fig = px.line(
+                trend_data,
+                x='Period',  # X-axis: Day, Week or Month
+                y=y_label,
+                title=title,
+                markers=True,
+                labels={'Period': x_label, y_label: f"{y_label} ({unit})"},
+                text=f'Formatted {trend_metric}',
+                hover_data={y_label: True, f'Formatted {trend_metric}': True},
+            )
+            fig.update_traces(
+                line=dict(color='green', width=2), 
+                marker=dict(size=8), 
+                textposition='top center'
+            )
+            fig.update_layout(
+                xaxis_title=x_label,
+                yaxis_title=f"{y_label} ({unit})",
+                hovermode="x unified",
+                template="plotly_white",
+                width=1200,
+                height=500,
+            )
+            return fig
+
         # Display the chart
-        st.plotly_chart(fig)
+        st.plotly_chart(cached(('trend', trend_type, trend_metric), build_trend_figure))
 
 
     ###### TOP 10
     # Top 10 'title' by count of unique emails (horizontal bars)
-    if 'title' in filtered_df.columns and 'email' in filtered_df.columns:
-        top_titles = (
-            filtered_df.groupby('title')['email']
-            .nunique()
-            .reset_index()
-            .rename(columns={'email': 'email_count'})
-            .sort_values(by='email_count', ascending=False)
-            .head(10)
-        )
-        top_titles['title'] = top_titles['title'].apply(lambda x: "<br>".join(textwrap.wrap(x, width=50)))
-        # Create a horizontal bar chart with data labels
-        fig_titles = px.bar(
-            top_titles,
-            y='title', 
-            x='email_count',
-            text='email_count', 
-            labels={'email_count': 'Email Count', 'title': 'Title'},
-            title="Top 10 Titles"
-        )
-        # Update layout to show the data labels and improve readability
-        fig_titles.update_traces(texttemplate='%{text}', textposition='outside')
-        fig_titles.update_layout(
-            height=600,
-            yaxis=dict(categoryorder='total ascending'), 
-        )
-        st.plotly_chart(fig_titles)
-
-    col2, col3 = st.columns(2)
-    with col2:
-        # Top 10 'category_name' by count of unique emails (vertical bars)
-        if 'category_name' in filtered_df.columns and 'email' in filtered_df.columns:
-            top_categories = (
-                filtered_df.groupby('category_name')['email']
-                .nunique()
+    if 'title' in df_combined.columns and 'email' in df_combined.columns:
+        def build_top_titles_figure():
+            top_titles = (
+                aggregates['title']['users']
                 .reset_index()
-                .rename(columns={'email': 'email_count'})
+                .rename(columns={'users': 'email_count'})
                 .sort_values(by='email_count', ascending=False)
                 .head(10)
             )
-
-            # Create a vertical bar chart with data labels
-            fig_categories = px.bar(
-                top_categories,
-                x='category_name',
-                y='email_count',
-                text='email_count',  # Add data labels
-                labels={'email_count': 'Email Count', 'category_name': 'Category'},
-                title="Top 10 Categories"
+            top_titles['title'] = top_titles['title'].apply(lambda x: "<br>".join(textwrap.wrap(x, width=50)))
+            # Create a horizontal bar chart with data labels
+            fig_titles = px.bar(
+                top_titles,
+                y='title', 
+                x='email_count',
+                text='email_count', 
+                labels={'email_count': 'Email Count', 'title': 'Title'},
+                title="Top 10 Titles"
             )
-            # Update layout to show the data labels
-            fig_categories.update_traces(texttemplate='%{text}', textposition='outside')
-            fig_categories.update_layout(
-                height=500,  # Adjust height for better spacing
-                xaxis=dict(
-                    tickangle=-45,  # Rotate x-axis labels for better readability
-                ),
-                yaxis=dict(title='Email Count'),  # Add y-axis title for clarity
+            # Update layout to show the data labels and improve readability
+            fig_titles.update_traces(texttemplate='%{text}', textposition='outside')
+            fig_titles.update_layout(
+                height=600,
+                yaxis=dict(categoryorder='total ascending'), 
             )
-            st.plotly_chart(fig_categories)
+            return fig_titles
 
-    with col3:
-        # Top 10 'wilayah' by count of unique emails
-        if 'wilayah' in filtered_df.columns and 'email' in filtered_df.columns:
-            # Calculate email_count (Jumlah Karyawan)
-            email_count = (
-                filtered_df.groupby('wilayah')['email']
-                .nunique()
-                .reset_index()
-                .rename(columns={'email': 'user'})
-            )
-            
-            # Calculate enrollment (email_count with non-null no_transaksi)
-            if 'no_transaksi' in filtered_df.columns:
-                enrollment = (
-                    filtered_df[filtered_df['no_transaksi'].notnull()]
-                    .groupby('wilayah')['email']
-                    .nunique()
+        st.plotly_chart(cached('top_titles', build_top_titles_figure))
+
+    col2, col3 = st.columns(2)
+    with col2:
+        # Top 10 'category_name' by count of unique emails (vertical bars)
+        if 'category_name' in df_combined.columns and 'email' in df_combined.columns:
+            def build_top_categories_figure():
+                top_categories = (
+                    aggregates['category_name']['users']
                     .reset_index()
-                    .rename(columns={'email': 'enrollment'})
+                    .rename(columns={'users': 'email_count'})
+                    .sort_values(by='email_count', ascending=False)
+                    .head(10)
                 )
-            else:
-                enrollment = pd.DataFrame(columns=['wilayah', 'enrollment'])
-            
-            # Calculate count of distinct users with progress 100%
-            if 'progress' in filtered_df.columns:
-                progress_100_user = (
-                    filtered_df[filtered_df['progress'] == 100]
-                    .groupby('wilayah')['email']
-                    .nunique()
-                    .reset_index()
-                    .rename(columns={'email': 'progress_100%'})
+
+                # Create a vertical bar chart with data labels
+                fig_categories = px.bar(
+                    top_categories,
+                    x='category_name',
+                    y='email_count',
+                    text='email_count',  # Add data labels
+                    labels={'email_count': 'Email Count', 'category_name': 'Category'},
+                    title="Top 10 Categories"
                 )
-            else:
-                progress_100_user = pd.DataFrame(columns=['wilayah', 'progress_100%'])
-            
-            # Merge email_count, enrollment, and progress_100_user
-            top_wilayah = pd.merge(email_count, enrollment, on='wilayah', how='left')
-            top_wilayah = pd.merge(top_wilayah, progress_100_user, on='wilayah', how='left')
-            
-            # Fill missing values in enrollment and progress_100_user with 0
-            top_wilayah['enrollment'] = top_wilayah['enrollment'].fillna(0).astype(int)
-            top_wilayah['progress_100%'] = top_wilayah['progress_100%'].fillna(0).astype(int)
-            
-            # Calculate learning_adoption
-            top_wilayah['learning_adoption'] = (
-                top_wilayah['enrollment'] / top_wilayah['user']
-            ).round(2)
-            
-            # Sort by email_count and show top 10
-            top_wilayah = top_wilayah.sort_values(by='user', ascending=False).head(20)
-            
+                # Update layout to show the data labels
+                fig_categories.update_traces(texttemplate='%{text}', textposition='outside')
+                fig_categories.update_layout(
+                    height=500,  # Adjust height for better spacing
+                    xaxis=dict(
+                        tickangle=-45,  # Rotate x-axis labels for better readability
+                    ),
+                    yaxis=dict(title='Email Count'),  # Add y-axis title for clarity
+                )
+                return fig_categories
+
+            st.plotly_chart(cached('top_categories', build_top_categories_figure))
+
+    with col3:
+        # Top 10 'wilayah' by count of unique emails
+        if 'wilayah' in df_combined.columns and 'email' in df_combined.columns:
             st.write("**Top Wilayah**")
-            st.dataframe(top_wilayah)
+            # Sort by user count and show the top 20
+            st.dataframe(cached('wilayah_adoption', build_wilayah_adoption).head(20))
 
 
 
     col4, col5 = st.columns(2)
     with col4:
-        if 'title' in filtered_df.columns and 'price' in filtered_df.columns and 'email' in filtered_df.columns:
-            # Group by title and calculate the metrics
-            title_usage_data = (
-                filtered_df.groupby('title')
-                .agg(
-                    enrollment=('email', pd.Series.nunique),  # Count distinct emails
-                    price=('price', 'mean'),  # Average price
-                    total_price=('price', 'sum')  # Total price (Jumlah Penggunaan)
+        if 'title' in df_combined.columns and 'price' in df_combined.columns and 'email' in df_combined.columns:
+            def build_title_usage():
+                # Group by title and calculate the metrics
+                title_usage_data = (
+                    aggregates['title'][['users', 'avg_price', 'price']]  # Distinct emails, average and total price
+                    .reset_index()
+                    .rename(columns={'users': 'Enrollment', 'avg_price': 'Price', 'price': 'Total Price'})
+                    .sort_values(by='Total Price', ascending=False)
                 )
-                .reset_index()
-                .rename(columns={'enrollment': 'Enrollment', 'price': 'Price', 'total_price': 'Total Price'})
-                .sort_values(by='Total Price', ascending=False)
-            )
 
-            title_usage_data.index = title_usage_data.index + 1
+                title_usage_data.index = title_usage_data.index + 1
+                return title_usage_data
 
             # Display the data in a table
             st.write("**Jumlah nilai transaksi per Title**")
-            st.dataframe(title_usage_data)
+            st.dataframe(cached('title_usage', build_title_usage))
 
     with col5:
         # Top 10 users by count of titles
-        if 'title' in filtered_df.columns and 'nama' in filtered_df.columns:
-            # Count title enrollment (count of titles grouped by nama and wilayah)
-            title_count = (
-                filtered_df.groupby(['nama', 'wilayah'])['title']  # Group by nama and wilayah
-                .count()
-                .reset_index()
-                .rename(columns={'title': 'title_count'})
-            )
-            
-            # Count progress when they already 100 (count rows where progress == 100 grouped by nama and wilayah)
-            if 'progress' in filtered_df.columns:
-                progress_100_count = (
-                    filtered_df[filtered_df['progress'] == 100]
-                    .groupby(['nama', 'wilayah'])
-                    .size()
-                    .reset_index(name='progress_100%')
-                )
-            else:
-                progress_100_count = pd.DataFrame(columns=['nama', 'wilayah', 'progress_100%'])
-            
-            # Merge the title_count and progress_100_count DataFrames
-            top_users = pd.merge(title_count, progress_100_count, on=['nama', 'wilayah'], how='left')
-            
-            # Fill missing values in progress_100% with 0
-            top_users['progress_100%'] = top_users['progress_100%'].fillna(0).astype(int)
-            
-            # Sort by progress_100_count and show top 10 users
-            top_users = top_users.sort_values(by='progress_100%', ascending=False).head(10)
-            
-            # Reset index to ensure display numbering starts at 1
-            top_users.index = range(1, len(top_users) + 1)
-            
-            # Display the DataFrame with only relevant columns
+        if 'title' in df_combined.columns and 'nama' in df_combined.columns:
+            # Title and 100% progress row counts per user and wilayah, from the aggregation pass
             st.write("**Top 10 Users by 100% Progress**")
-            st.dataframe(top_users[['nama', 'wilayah', 'title_count', 'progress_100%']])
-    # Add an expander for "All User Progress"
-    with st.expander("All User Progress"):
-        # Select the relevant columns, including 'title'
-        user_progress_df = filtered_df[['nama','email', 'unit_kerja',  'title','updated_at', 'status', 'enroll_date', 'voucher']]
-        
-        # Drop rows where 'title' is None or NaN
-        user_progress_df = user_progress_df.dropna(subset=['title'])
-        
-        # Display the dataframe
-        st.dataframe(user_progress_df)
-
-
-
-        
-
-
-
+            st.dataframe(aggregates['top_users'])
+    # "All User Progress" is only built and paged while it is switched on
+    # The relevant columns of the filtered rows that have a title
+    paginated_table(
+        "All User Progress", df_combined, key='user_progress',
+        rows=lambda: user_progress_rows(df_combined, filter_rows), cached=cached, columns=USER_PROGRESS_COLUMNS,
+    )
 
+    ###### EXPORT
+    # Files are written from the shared snapshot in chunks, only when asked for
+    with st.expander("Export"):
+        export_col1, export_col2 = st.columns(2)
+        with export_col1:
+            export_dataset = st.selectbox("Dataset", options=["Filtered Data", "All User Progress", "Wilayah Adoption"])
+        with export_col2:
+            export_format = st.selectbox("Format", options=list(FORMATS))
+
+        if st.button("Prepare file"):
+            if export_dataset == "Filtered Data":
+                data = export_bytes(df_combined, export_format, rows=filter_rows)
+            elif export_dataset == "All User Progress":
+                data = export_bytes(
+                    df_combined, export_format,
+                    rows=user_progress_rows(df_combined, filter_rows), columns=USER_PROGRESS_COLUMNS,
+                )
+            else:
+                data = export_bytes(cached('wilayah_adoption', build_wilayah_adoption), export_format)
+            st.download_button(
+                "Download",
+                data,
+                file_name=f"{export_dataset.lower().replace(' ', '_')}_{datetime.now():%Y%m%d}.{FORMATS[export_format]['extension']}",
+                mime=FORMATS[export_format]['mime'],
+            )
 
+    if instrumentation.is_admin(st.session_state.get('username')):
+        instrumentation.admin_panel()
 
     # Footer
     st.markdown("---")
@@ -0,0 +1,175 @@
+# Times each stage of the merge -> filter -> aggregate -> render pipeline on
+# synthetic data and records peak memory per stage. Results are written as JSON;
+# pass --baseline with an earlier result file to flag regressions.
+#
+#   python -m bench.pipeline_bench --employees 200000 --transactions 1000000 --output bench_pipeline.json
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from bench.synthetic import make_employees, make_transactions
+from data_processing import normalize_emails, drop_internal_emails
+from email_index import EmailIndex
+from filter_engine import FilterEngine
+from rollups import build_rollup
+from timeseries import build_timeseries
+from aggregations import aggregate
+
+
+class Recorder:
+    def __init__(self, repeats):
+        self.repeats = repeats
+        self.stages = []
+
+    def run(self, stage, fn, *args, **kwargs):
+        # Best-of-N wall time with tracing off, then one separate traced run for
+        # peak memory, since tracemalloc slows down every allocation it sees
+        timings, result = [], None
+        for _ in range(self.repeats):
+            gc.collect()
+            started = time.perf_counter()
+            result = fn(*args, **kwargs)
+            timings.append(time.perf_counter() - started)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn(*args, **kwargs)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.stages.append({
+            'stage': stage,
+            'seconds': min(timings),
+            'peak_bytes': peak,
+            'rows': len(result) if hasattr(result, '__len__') else None,
+        })
+        print(f"{stage:<32} {min(timings):>9.4f}s {peak / 2**20:>9.1f} MiB")
+        return result
+
+
+def _version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def run(args):
+    df_id = make_transactions(args.transactions, args.employees, unmatched_ratio=args.unmatched_ratio, seed=args.seed)
+    df_bpjs = make_employees(args.employees, duplicate_ratio=args.duplicate_ratio, seed=args.seed + 1)
+    rec = Recorder(args.repeats)
+
+    # Merge
+    df_id = rec.run('normalize_emails_id', normalize_emails, df_id)
+    df_bpjs = rec.run('normalize_emails_bpjs', normalize_emails, df_bpjs)
+    df_id = rec.run('growthcenter_filter_id', drop_internal_emails, df_id)
+    df_bpjs = rec.run('growthcenter_filter_bpjs', drop_internal_emails, df_bpjs)
+    rec.run('email_index_build', lambda: EmailIndex().update(df_bpjs))
+    index = EmailIndex()
+    index.update(df_bpjs)
+    changed = df_bpjs.assign(unit_kerja=df_bpjs['unit_kerja'].where(np.arange(len(df_bpjs)) % 100 != 0, 'Kantor Pusat'))
+    rec.run('email_index_diff', lambda: index.update(changed))
+    df_combined = rec.run('email_join', index.join, df_id)
+
+    # Per-snapshot structures
+    rollup = rec.run('build_rollup', build_rollup, df_combined)
+    engine = rec.run('build_filter_engine', FilterEngine, df_combined)
+    timeseries = rec.run('build_timeseries', build_timeseries, df_combined)
+
+    # Filters
+    wilayah = sorted(df_combined['wilayah'].dropna().unique())[:2]
+    category = list(df_combined['category_name'].dropna().unique()[:3])
+    date_range = (datetime(2024, 3, 1), datetime(2024, 9, 30))
+    rec.run('filter_name', engine.select, name='budi')
+    rec.run('filter_date', engine.select, date_range=date_range)
+    rec.run('filter_wilayah', engine.select, wilayah=wilayah)
+    rec.run('filter_category', engine.select, categories=category)
+    rec.run('filter_voucher', engine.select, voucher='KOGNISIXBPJSTK')
+    rows = rec.run('filter_combined', engine.select, date_range=date_range, wilayah=wilayah, voucher='KOGNISIXBPJSTK')
+    rec.run('take_filtered_rows', df_combined.take, rows)
+    name_rows = df_combined.take(engine.select(name='budi', date_range=date_range))
+    rec.run('build_rollup_name', build_rollup, name_rows, by_day=False)
+
+    # Chart and table aggregations
+    selection = rollup.select(date_range, wilayah, None, 'KOGNISIXBPJSTK')
+    rec.run('kpis', rollup.kpis, selection)
+    groups = timeseries.select(wilayah, None, 'KOGNISIXBPJSTK')
+    trend = rec.run('trend_weekly', timeseries.series, ['price'], groups, 'W', date_range)
+    rec.run('trend_monthly', timeseries.series, ['price'], groups, 'M', date_range)
+    rec.run('trend_weekly_all_metrics', timeseries.series, ['price', 'enrollments', 'completions', 'hours'], groups, 'W', date_range)
+    rec.run('top_titles', rollup.by, selection, 'title')
+    rec.run('top_categories', rollup.by, selection, 'category_name')
+    rec.run('wilayah_adoption', rollup.by, selection, 'wilayah')
+    rec.run('aggregate_all', aggregate, rollup, selection)
+
+    # Render
+    trend_data = trend.reset_index().rename(columns={'price': 'Total Jumlah Penggunaan'})
+    trend_data['Period'] = trend_data['Period'].astype(str)
+    rec.run('render_trend_figure', px.line, trend_data, x='Period', y='Total Jumlah Penggunaan', markers=True)
+
+    return {
+        'version': _version(),
+        'run_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'params': vars(args),
+        'rows': {'transactions': len(df_id), 'employees': len(df_bpjs), 'combined': len(df_combined)},
+        'stages': rec.stages,
+    }
+
+
+def compare(result, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {stage['stage']: stage for stage in json.load(f)['stages']}
+    regressions = []
+    for stage in result['stages']:
+        before = baseline.get(stage['stage'])
+        if before and before['seconds'] > 0 and stage['seconds'] / before['seconds'] > threshold:
+            regressions.append({
+                'stage': stage['stage'],
+                'baseline_seconds': before['seconds'],
+                'seconds': stage['seconds'],
+                'ratio': stage['seconds'] / before['seconds'],
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard data pipeline on synthetic data")
+    parser.add_argument('--employees', type=int, default=50000)
+    parser.add_argument('--transactions', type=int, default=200000)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.02, help="share of employees listed twice in the sheet")
+    parser.add_argument('--unmatched-ratio', type=float, default=0.05, help="share of transactions with no sheet match")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_pipeline.json')
+    parser.add_argument('--baseline', help="earlier result file to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    result = run(args)
+
+    if args.baseline:
+        result['regressions'] = compare(result, args.baseline, args.threshold)
+        for regression in result['regressions']:
+            print(f"REGRESSION {regression['stage']}: {regression['baseline_seconds']:.4f}s -> "
+                  f"{regression['seconds']:.4f}s ({regression['ratio']:.2f}x)")
+
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2, default=str)
+    print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+# Compares the legacy query_id.sql (bench/query_id_legacy.sql) with the current
+# one on a synthetic dataset in a local MySQL: runtime, EXPLAIN plans and result
+# equality. It DROPS and recreates the tables below, so only point it at a
+# scratch database.
+#
+#   python -m bench.query_bench --user root --password secret --database kognisi_bench \
+#       --users 5000 --courses 200 --transactions 20000
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from db import ConnectionManager
+
+LEGACY_QUERY = 'bench/query_id_legacy.sql'
+CURRENT_QUERY = 'query_id.sql'
+VOUCHERS = ['KOGNISIXBPJSTK', 'KOGNISIXBPJSKACAB', 'KOGNISIXBPJSTK155', 'OTHERVOUCHER']
+
+SCHEMA = [
+    "CREATE TABLE users (serial BIGINT PRIMARY KEY, full_name VARCHAR(255), phone_number VARCHAR(32), email VARCHAR(255))",
+    "CREATE TABLE categories (serial BIGINT PRIMARY KEY, name VARCHAR(255))",
+    "CREATE TABLE courses (serial BIGINT PRIMARY KEY, title VARCHAR(255), category_serial BIGINT, price_normal DECIMAL(12,2))",
+    "CREATE TABLE vouchers (serial BIGINT PRIMARY KEY, code VARCHAR(64))",
+    "CREATE TABLE voucher_claims (id BIGINT AUTO_INCREMENT PRIMARY KEY, user_serial BIGINT, voucher_serial BIGINT)",
+    "CREATE TABLE transactions (serial VARCHAR(32) PRIMARY KEY, user_serial BIGINT, course_serial BIGINT, "
+    "voucher_serial BIGINT, status VARCHAR(16), invoice_id VARCHAR(32), created_at DATETIME)",
+    "CREATE TABLE course_users (course_serial BIGINT, user_serial BIGINT, is_accomplished TINYINT)",
+    "CREATE TABLE course_user_progress (id BIGINT AUTO_INCREMENT PRIMARY KEY, user_serial BIGINT, course_serial BIGINT, "
+    "progress_percentage DECIMAL(5,2), progress_duration DECIMAL(12,2), score DECIMAL(5,2), created_at DATETIME, updated_at DATETIME)",
+    "CREATE TABLE course_sections (serial BIGINT AUTO_INCREMENT PRIMARY KEY, course_serial BIGINT)",
+    "CREATE TABLE course_contents (serial BIGINT AUTO_INCREMENT PRIMARY KEY, course_serial BIGINT, title VARCHAR(255))",
+    "CREATE TABLE course_user_quiz_answers (id BIGINT AUTO_INCREMENT PRIMARY KEY, user_serial BIGINT, course_serial BIGINT, is_correct TINYINT)",
+]
+TABLES = [statement.split()[2] for statement in SCHEMA]
+
+
+def _insert(conn, table, columns, rows, batch_size=5000):
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    with conn.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+    conn.commit()
+
+
+def generate(db, args):
+    rng = random.Random(args.seed)
+    start = datetime(2024, 1, 1)
+
+    def moment():
+        return start + timedelta(minutes=rng.randrange(400 * 24 * 60))
+
+    with db.connection() as conn:
+        with conn.cursor() as cursor:
+            for table in TABLES:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            for statement in SCHEMA:
+                cursor.execute(statement)
+
+        _insert(conn, 'users', ['serial', 'full_name', 'phone_number', 'email'], [
+            (i, f"User {i}", f"08{i:09d}", f"user{i}@example.com") for i in range(args.users)
+        ])
+        _insert(conn, 'categories', ['serial', 'name'], [(i, f"Category {i}") for i in range(20)])
+        _insert(conn, 'courses', ['serial', 'title', 'category_serial', 'price_normal'], [
+            (i, f"Course {i}", rng.randrange(20), rng.choice([99000, 149000, 249000])) for i in range(args.courses)
+        ])
+        _insert(conn, 'vouchers', ['serial', 'code'], list(enumerate(VOUCHERS)))
+        _insert(conn, 'voucher_claims', ['user_serial', 'voucher_serial'], [
+            (rng.randrange(args.users), rng.randrange(len(VOUCHERS))) for _ in range(args.users)
+        ])
+
+        sections, contents = [], []
+        for course in range(args.courses):
+            sections += [(course,)] * args.sections
+            titles = ['Pre Test', 'Post Test'] + [f"Lesson {i}" for i in range(max(args.contents - 2, 0))]
+            contents += [(course, title) for title in titles[:args.contents]]
+        _insert(conn, 'course_sections', ['course_serial'], sections)
+        _insert(conn, 'course_contents', ['course_serial', 'title'], contents)
+
+        # One transaction per distinct (user, course) pair
+        pairs = set()
+        while len(pairs) < min(args.transactions, args.users * args.courses):
+            pairs.add((rng.randrange(args.users), rng.randrange(args.courses)))
+        transactions, course_users, progress, answers = [], [], [], []
+        for i, (user, course) in enumerate(pairs):
+            created_at = moment()
+            status = 'SUCCEEDED' if rng.random() < 0.9 else 'FAILED'
+            transactions.append((f"TRX{i:08d}", user, course, rng.randrange(len(VOUCHERS)), status, f"INV{i}", created_at))
+            course_users.append((course, user, int(rng.random() < 0.4)))
+            for _ in range(rng.randrange(args.progress + 1)):
+                updated_at = created_at + timedelta(hours=rng.randrange(2000))
+                progress.append((user, course, rng.choice([0, 25, 50, 100]), rng.randrange(3600), rng.randrange(101),
+                                 created_at, updated_at))
+            answers += [(user, course, int(rng.random() < 0.7)) for _ in range(rng.randrange(5))]
+        _insert(conn, 'transactions', ['serial', 'user_serial', 'course_serial', 'voucher_serial', 'status',
+                                       'invoice_id', 'created_at'], transactions)
+        _insert(conn, 'course_users', ['course_serial', 'user_serial', 'is_accomplished'], course_users)
+        _insert(conn, 'course_user_progress', ['user_serial', 'course_serial', 'progress_percentage', 'progress_duration',
+                                               'score', 'created_at', 'updated_at'], progress)
+        _insert(conn, 'course_user_quiz_answers', ['user_serial', 'course_serial', 'is_correct'], answers)
+
+        with conn.cursor() as cursor:
+            for table in TABLES:
+                cursor.execute(f"ANALYZE TABLE {table}")
+                cursor.fetchall()
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read().strip().rstrip(';')
+
+
+def run_query(db, sql, args, repeats):
+    timings, rows = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        rows = db.query(sql, args)
+        timings.append(time.perf_counter() - started)
+    return pd.DataFrame(rows), timings
+
+
+def explain(db, sql, args):
+    return db.query("EXPLAIN " + sql, args)
+
+
+def compare(legacy, current):
+    # Everything must match except duration, which the legacy query inflates
+    legacy = legacy.sort_values('no_transaksi').reset_index(drop=True)
+    current = current.sort_values('no_transaksi').reset_index(drop=True)
+    report = {'legacy_rows': len(legacy), 'current_rows': len(current), 'mismatched_columns': []}
+    if len(legacy) != len(current) or list(legacy['no_transaksi']) != list(current['no_transaksi']):
+        report['mismatched_columns'].append('no_transaksi')
+        return report
+    for col in legacy.columns:
+        if col == 'duration':
+            continue
+        left = legacy[col].astype(object).where(legacy[col].notnull(), None)
+        right = current[col].astype(object).where(current[col].notnull(), None)
+        if not left.equals(right):
+            report['mismatched_columns'].append(col)
+    inflated = legacy['duration'].astype(float) > current['duration'].astype(float)
+    report['duration_inflated_rows'] = int(inflated.sum())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legacy vs current query_id.sql on synthetic data")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3306)
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--database', default='kognisi_bench')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--courses', type=int, default=100)
+    parser.add_argument('--transactions', type=int, default=5000)
+    parser.add_argument('--sections', type=int, default=5, help="sections per course")
+    parser.add_argument('--contents', type=int, default=10, help="contents per course")
+    parser.add_argument('--progress', type=int, default=4, help="max progress rows per enrollment")
+    parser.add_argument('--since', default='2025-01-15', help="watermark for the incremental sync timing")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-generate', action='store_true', help="reuse the data already loaded")
+    parser.add_argument('--output', default='bench_query_id.json')
+    args = parser.parse_args()
+
+    db = ConnectionManager({
+        'host': args.host,
+        'port': args.port,
+        'user': args.user,
+        'password': args.password,
+        'database': args.database,
+    })
+    if not args.skip_generate:
+        generate(db, args)
+
+    legacy_sql, current_sql = _read(LEGACY_QUERY), _read(CURRENT_QUERY)
+    params = {'since': datetime(1970, 1, 1), 'vouchers': tuple(VOUCHERS[:3])}
+    legacy, legacy_timings = run_query(db, legacy_sql, None, args.repeats)
+    current, current_timings = run_query(db, current_sql, params, args.repeats)
+    # An incremental sync: only transactions created or with progress since the watermark
+    incremental_params = dict(params, since=datetime.fromisoformat(args.since))
+    incremental, incremental_timings = run_query(db, current_sql, incremental_params, args.repeats)
+
+    result = {
+        'dataset': {k: getattr(args, k) for k in ('users', 'courses', 'transactions', 'sections', 'contents', 'progress')},
+        'legacy_seconds': legacy_timings,
+        'current_seconds': current_timings,
+        'speedup': min(legacy_timings) / min(current_timings) if min(current_timings) else None,
+        'incremental_since': args.since,
+        'incremental_rows': len(incremental),
+        'incremental_seconds': incremental_timings,
+        'equality': compare(legacy, current),
+        'legacy_plan': explain(db, legacy_sql, None),
+        'current_plan': explain(db, current_sql, params),
+        'incremental_plan': explain(db, current_sql, incremental_params),
+    }
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2, default=str)
+
+    print(f"legacy  best {min(legacy_timings):.3f}s")
+    print(f"current best {min(current_timings):.3f}s")
+    print(f"incremental since {args.since}: best {min(incremental_timings):.3f}s, {len(incremental)} rows")
+    print(f"equality: {result['equality']}")
+    print(f"full report written to {args.output}")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# Synthetic data shaped like the dashboard sources: query_id.sql transaction
+# rows and BPJS sheet employee rows (email, wilayah, unit_kerja).
+
+import numpy as np
+import pandas as pd
+
+VOUCHERS = ['KOGNISIXBPJSTK', 'KOGNISIXBPJSKACAB', 'KOGNISIXBPJSTK155']
+FIRST_NAMES = ['Agus', 'Budi', 'Citra', 'Dewi', 'Eko', 'Fitri', 'Gilang', 'Hana', 'Indra', 'Joko', 'Kartika', 'Lestari']
+LAST_NAMES = ['Santoso', 'Wijaya', 'Pratama', 'Saputra', 'Hidayat', 'Kusuma', 'Nugroho', 'Lestari', 'Putri']
+
+
+def _emails(ids, rng, messy_ratio=0.1):
+    # Some emails come with stray whitespace or upper case, like the real sources
+    emails = np.char.add(np.char.add('employee', ids.astype(str)), '@bpjsketenagakerjaan.go.id').astype(object)
+    messy = rng.random(len(ids)) < messy_ratio
+    emails[messy] = [f"  {email.upper()} " for email in emails[messy]]
+    return emails
+
+
+def make_employees(n_employees, duplicate_ratio=0.02, n_wilayah=11, n_units=300, seed=0):
+    # BPJS sheet rows; duplicate_ratio of employees appear twice
+    rng = np.random.default_rng(seed)
+    ids = np.arange(n_employees)
+    ids = np.concatenate([ids, rng.choice(ids, int(n_employees * duplicate_ratio), replace=False)])
+    wilayah = np.array([f"Kanwil {i + 1}" for i in range(n_wilayah)], dtype=object)
+    units = np.array([f"Kantor Cabang {i + 1}" for i in range(n_units)], dtype=object)
+    unit_codes = rng.integers(0, n_units, len(ids))
+    return pd.DataFrame({
+        'email': _emails(ids, rng),
+        'wilayah': wilayah[unit_codes % n_wilayah],
+        'unit_kerja': units[unit_codes],
+    })
+
+
+def make_transactions(n_transactions, n_employees, unmatched_ratio=0.05, internal_ratio=0.01,
+                      n_courses=500, n_categories=20, seed=1):
+    # query_id.sql rows; unmatched_ratio of buyers are not in the BPJS sheet and
+    # internal_ratio are @growthcenter.id accounts that get filtered out
+    rng = np.random.default_rng(seed)
+    buyers = rng.integers(0, n_employees, n_transactions)
+    unmatched = rng.random(n_transactions) < unmatched_ratio
+    buyers[unmatched] += n_employees
+    emails = _emails(buyers, rng)
+    internal = rng.random(n_transactions) < internal_ratio
+    emails[internal] = [f"staff{i}@growthcenter.id" for i in np.flatnonzero(internal)]
+
+    names = np.array([f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES], dtype=object)
+    courses = rng.integers(0, n_courses, n_transactions)
+    enroll_date = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 500 * 24 * 60, n_transactions), unit='m')
+    progress = rng.choice([0.0, 12.5, 25.0, 50.0, 75.0, 100.0], n_transactions)
+    return pd.DataFrame({
+        'no_transaksi': np.char.add('TRX', np.arange(n_transactions).astype(str)).astype(object),
+        'enroll_date': enroll_date,
+        'nama': names[buyers % len(names)],
+        'phone_number': np.char.add('08', buyers.astype(str)).astype(object),
+        'email': emails,
+        'title': np.char.add('Course ', courses.astype(str)).astype(object),
+        'category_name': pd.Categorical(np.char.add('Category ', (courses % n_categories).astype(str))),
+        'voucher': pd.Categorical(rng.choice(VOUCHERS, n_transactions, p=[0.7, 0.2, 0.1])),
+        'price': rng.choice([99000.0, 149000.0, 249000.0], n_transactions),
+        'created_at': enroll_date,
+        'updated_at': enroll_date + pd.to_timedelta(rng.integers(0, 2000, n_transactions), unit='h'),
+        'progress': progress,
+        'duration': rng.random(n_transactions) * 7200,
+        'total_correct_answers': rng.integers(0, 20, n_transactions).astype(float),
+        'status': pd.Categorical(np.where(progress == 100, 'Finished', 'In Progress')),
+        'pre_test': rng.integers(0, 101, n_transactions).astype(float),
+        'post_test': rng.integers(0, 101, n_transactions).astype(float),
+    })
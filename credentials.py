@@ -0,0 +1,49 @@
+import hashlib
+
+import pandas as pd
+
+# Login credentials compiled once per creds snapshot. Usernames are keyed the
+# way streamlit_authenticator looks them up (lower case), so building an
+# authenticator for a session is a plain dict copy instead of a walk over the
+# roster.
+COOKIE = {
+    "name": "growth_center",
+    "key": "growth_2024",
+    "expiry_days": 30,
+}
+
+
+class CredentialStore:
+    def __init__(self, usernames):
+        self.usernames = usernames
+        # Content digest: unchanged creds keep their version across refreshes
+        self.version = hashlib.sha1(repr(sorted(usernames.items())).encode()).hexdigest()
+
+    def __len__(self):
+        return len(self.usernames)
+
+    def __contains__(self, username):
+        return str(username).lower() in self.usernames
+
+    def get(self, username):
+        return self.usernames.get(str(username).lower())
+
+    def session_credentials(self):
+        # The authenticator writes login state into these records, so each session gets its own
+        return {'usernames': {username: dict(record) for username, record in self.usernames.items()}}
+
+
+def build_credentials(df_creds):
+    if df_creds is None or df_creds.empty or 'username' not in df_creds.columns:
+        return CredentialStore({})
+    df = df_creds[df_creds['username'].notnull()]
+    # Later rows win for repeated usernames, as with the row-by-row build
+    keys = df['username'].astype(str).str.lower()
+    keep = ~keys.duplicated(keep='last')
+    df, keys = df[keep], keys[keep]
+    records = pd.DataFrame({
+        'name': df['username'],
+        'password': df['password'],  # Password should already be hashed
+        'email': df['email'],
+    }).to_dict('records')
+    return CredentialStore(dict(zip(keys, records)))
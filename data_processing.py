@@ -3,40 +3,220 @@ import pandas as pd
 import numpy as np
 from fetch_data import fetch_data_id, fetch_bpjs, fetch_creds
 from datetime import datetime
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from refresher import Refresher
+from rollups import build_rollup
+from timeseries import build_timeseries
+from filter_engine import FilterEngine
+from schema import compact
+from memo import LRUCache
+from email_index import EmailIndex
+from ledger import Ledger
+from credentials import build_credentials
+import instrumentation
+from programmes import get_programme
 
-@st.cache_data(ttl=86400)
-def fetch_combined():
-    # Fetch data from both sources
-    df_id = fetch_data_id()
-    df_bpjs = fetch_bpjs() 
-    df_creds = fetch_creds()
+# Each programme's background worker rebuilds its combined dataset every
+# programme.refresh_interval seconds
+FIRST_LOAD_TIMEOUT = 600
+
+# Loaders take the programme key
+SOURCES = {'id': fetch_data_id, 'bpjs': fetch_bpjs, 'creds': fetch_creds}
+# Per-source timeouts (seconds), measured from when the fetches start
+SOURCE_TIMEOUTS = {'id': 600, 'bpjs': 120, 'creds': 120}
+DEFAULT_SOURCE_TIMEOUT = 300
+
+# Bounds for each programme's cross-session memo of filtered selections, tables and figures
+MEMO_MAX_ENTRIES = 512
+MEMO_MAX_BYTES = 512 * 2**20
+
+class SourceFetchError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"{name}: {error}" for name, error in errors.items()))
+
+def _timed_fetch(name, loader):
+    with instrumentation.span(f"fetch.{name}") as span:
+        df = loader()
+        span.set_frame(df)
+    return df
+
+def fetch_sources(sources=None, timeouts=None):
+    # Run the independent source fetches concurrently, collecting results and errors per source
+    sources = sources or SOURCES
+    timeouts = timeouts or SOURCE_TIMEOUTS
+    results, errors = {}, {}
+    pool = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="fetch")
+    try:
+        futures = {name: pool.submit(_timed_fetch, name, loader) for name, loader in sources.items()}
+        started = time.monotonic()
+        for name, future in futures.items():
+            remaining = timeouts.get(name, DEFAULT_SOURCE_TIMEOUT) - (time.monotonic() - started)
+            try:
+                results[name] = future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                errors[name] = f"timed out after {timeouts.get(name, DEFAULT_SOURCE_TIMEOUT)}s"
+            except Exception as e:
+                errors[name] = e
+    finally:
+        # Don't let a hung source hold up the others
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results, errors
+
+def fetch_combined(programme=None):
+    # Fetch the programme's data from all sources at once
+    programme = get_programme(programme).key
+    results, errors = fetch_sources({name: partial(loader, programme) for name, loader in SOURCES.items()})
+    if errors:
+        raise SourceFetchError(errors)
+    df_id = results['id']
+    df_bpjs = results['bpjs']
+    df_creds = results['creds']
 
     # Check for the presence of 'email' column
     if 'email' not in df_id.columns or 'email' not in df_bpjs.columns:
         st.error("One or both dataframes are missing the 'email' column.")
         return None, df_creds
 
+    with instrumentation.span('combine') as span:
+        df_combined = combine_sources(df_id, df_bpjs, get_email_index(programme), get_ledger(programme))
+        span.set_frame(df_combined)
+
+    return df_combined, df_creds
+
+def normalize_emails(df):
+    # The sources are shared cached frames: replace the column on a shallow copy, never in place
+    df = df.copy(deep=False)
+    df['email'] = df['email'].str.strip().str.lower()
+    return df
+
+def drop_internal_emails(df):
+    # Filter out emails ending with '@growthcenter.id'
+    return df[~df['email'].str.endswith('@growthcenter.id', na=False)]
+
+def combine_sources(df_id, df_bpjs, email_index=None, ledger=None):
     # Preprocess emails
-    df_id['email'] = df_id['email'].str.strip().str.lower()
-    df_bpjs['email'] = df_bpjs['email'].str.strip().str.lower()
+    df_id = normalize_emails(df_id)
+    df_bpjs = normalize_emails(df_bpjs)
 
     # Remove duplicate emails in each dataset
     #df_id = df_id.drop_duplicates(subset='email')
     #df_bpjs = df_bpjs.drop_duplicates(subset='email')
 
-    # Filter out emails ending with '@growthcenter.id'
-    df_id = df_id[~df_id['email'].str.endswith('@growthcenter.id', na=False)]
-    df_bpjs = df_bpjs[~df_bpjs['email'].str.endswith('@growthcenter.id', na=False)]
+    df_id = drop_internal_emails(df_id)
+    df_bpjs = drop_internal_emails(df_bpjs)
 
-    # Merge the datasets on email
-    df_combined = pd.merge(df_id, df_bpjs, on='email', how='outer', suffixes=('_id', '_bpjs'))
+    # Book the transactions before the join can repeat them
+    if ledger is not None:
+        with instrumentation.span('ledger'):
+            ledger.apply(df_id)
 
-    return df_combined, df_creds
+    # Join the datasets on email through the persistent employee index
+    email_index = email_index if email_index is not None else EmailIndex()
+    email_index.update(df_bpjs)
+    return email_index.join(df_id)
 
-def finalize_data(): 
-    df_combined, df_creds = fetch_combined() 
-    if df_combined is not None: 
-        return df_combined, df_creds 
-    else: 
-        st.error("Failed to fetch combined data due to missing columns.") 
+def _build_combined(programme):
+    df_combined, df_creds = fetch_combined(programme)
+    if df_combined is None:
+        raise ValueError("One or both dataframes are missing the 'email' column.")
+    # One compact, shared copy per snapshot; sessions only ever take row selections from it
+    with instrumentation.span('build.compact') as span:
+        df_combined = compact(df_combined)
+        span.set_frame(df_combined)
+    # Derived structures are rebuilt with every snapshot so readers never see them out of step
+    with instrumentation.span('build.credentials'):
+        credentials = build_credentials(df_creds)
+    with instrumentation.span('build.rollup'):
+        rollup = build_rollup(df_combined)
+    with instrumentation.span('build.filters'):
+        filters = FilterEngine(df_combined)
+    with instrumentation.span('build.timeseries'):
+        timeseries = build_timeseries(df_combined)
+    return {
+        'programme': programme,
+        'combined': df_combined,
+        'creds': df_creds,
+        'credentials': credentials,
+        'rollup': rollup,
+        'filters': filters,
+        'timeseries': timeseries,
+        # Unmatched emails on both sides of the join, for this refresh
+        'join_report': get_email_index(programme).last_report,
+        # Budget usage, burn rate and run-out projection as of this refresh
+        'ledger': get_ledger(programme).summary(),
+    }
+
+@st.cache_resource
+def get_email_index(programme):
+    # Kept across refreshes so sheet changes are applied as a diff
+    return EmailIndex()
+
+@st.cache_resource
+def get_ledger(programme):
+    # Kept across refreshes so each sync only books the changed transactions
+    return Ledger(get_programme(programme).budget)
+
+@st.cache_resource
+def _refresher(programme):
+    # One worker per programme rebuilds its combined dataset in the background,
+    # so one partner's refresh never holds up another's
+    programme = get_programme(programme)
+    return Refresher(
+        partial(_build_combined, programme.key), programme.refresh_interval, name=f"{programme.key}-refresher",
+    ).start()
+
+def get_refresher(programme=None):
+    return _refresher(get_programme(programme).key)
+
+def current_snapshot(programme=None):
+    refresher = get_refresher(programme)
+    snapshot = refresher.current()
+    if snapshot is None:
+        # Only the very first load of a cold process waits for the worker
+        with st.spinner("Loading data for the first time..."):
+            snapshot = refresher.wait_ready(FIRST_LOAD_TIMEOUT)
+    return snapshot
+
+def finalize_data(snapshot=None, programme=None):
+    snapshot = snapshot or current_snapshot(programme)
+    if snapshot is not None:
+        error = get_refresher(snapshot.data['programme']).last_error
+        if error:
+            st.warning(f"Showing the last good data; the latest refresh failed: {error}")
+        return snapshot.data['combined'], snapshot.data['creds']
+    else:
+        error = get_refresher(programme).last_error
+        st.error(f"Failed to fetch combined data: {error}" if error else "Failed to fetch combined data.")
         return pd.DataFrame(), pd.DataFrame()
+
+def current_rollup(snapshot=None, programme=None):
+    snapshot = snapshot or current_snapshot(programme)
+    return snapshot.data['rollup'] if snapshot is not None else build_rollup(pd.DataFrame())
+
+def current_filter_engine(snapshot=None, programme=None):
+    snapshot = snapshot or current_snapshot(programme)
+    return snapshot.data['filters'] if snapshot is not None else FilterEngine(pd.DataFrame())
+
+def current_timeseries(snapshot=None, programme=None):
+    snapshot = snapshot or current_snapshot(programme)
+    return snapshot.data['timeseries'] if snapshot is not None else build_timeseries(pd.DataFrame())
+
+def current_credentials(snapshot=None, programme=None):
+    snapshot = snapshot or current_snapshot(programme)
+    return snapshot.data['credentials'] if snapshot is not None else build_credentials(None)
+
+def current_ledger(snapshot=None, programme=None):
+    snapshot = snapshot or current_snapshot(programme)
+    return snapshot.data['ledger'] if snapshot is not None else Ledger(get_programme(programme).budget).summary()
+
+@st.cache_resource
+def _memo(programme):
+    # Derived tables and figures shared by every session viewing the programme;
+    # each programme has its own bounds so one partner's traffic can't evict another's
+    return LRUCache(max_entries=MEMO_MAX_ENTRIES, max_bytes=MEMO_MAX_BYTES)
+
+def get_memo(programme=None):
+    return _memo(get_programme(programme).key)
@@ -0,0 +1,209 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from io import StringIO
+
+import pandas as pd
+import paramiko
+import pymysql
+from pandas.api.types import union_categoricals
+from sshtunnel import SSHTunnelForwarder
+
+# Long-lived SSH tunnel plus a small pool of pymysql connections. With
+# ssh_config=None it connects straight to the database, e.g. a local MySQL.
+logger = logging.getLogger(__name__)
+
+
+def load_private_key(key_content, passphrase=None):
+    return paramiko.RSAKey.from_private_key(StringIO(key_content), password=passphrase)
+
+
+class ConnectionManager:
+    def __init__(self, db_config, ssh_config=None, pool_size=3, connect_timeout=10):
+        # db_config: host, port, user, password, database
+        # ssh_config: host, port, username, pkey
+        self.db_config = db_config
+        self.ssh_config = ssh_config
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._tunnel = None
+        self._lock = threading.Lock()
+
+    def _tunnel_is_up(self):
+        if self._tunnel is None or not self._tunnel.is_active:
+            return False
+        self._tunnel.check_tunnels()
+        return all(self._tunnel.tunnel_is_up.values())
+
+    def _ensure_tunnel(self):
+        # Returns the local (host, port) to connect to, (re)starting the tunnel if needed
+        if self.ssh_config is None:
+            return self.db_config['host'], self.db_config['port']
+        with self._lock:
+            if not self._tunnel_is_up():
+                if self._tunnel is not None:
+                    logger.warning("SSH tunnel is down, reconnecting")
+                    self._drain_pool()
+                    self._tunnel.stop()
+                self._tunnel = SSHTunnelForwarder(
+                    (self.ssh_config['host'], self.ssh_config['port']),
+                    ssh_username=self.ssh_config['username'],
+                    ssh_pkey=self.ssh_config['pkey'],
+                    remote_bind_address=(self.db_config['host'], self.db_config['port']),
+                    set_keepalive=30,
+                )
+                self._tunnel.start()
+            return '127.0.0.1', self._tunnel.local_bind_port
+
+    def _connect(self):
+        host, port = self._ensure_tunnel()
+        return pymysql.connect(
+            host=host,
+            port=port,
+            user=self.db_config['user'],
+            password=self.db_config['password'],
+            database=self.db_config['database'],
+            connect_timeout=self.connect_timeout,
+        )
+
+    def _is_healthy(self, conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except pymysql.MySQLError:
+            return False
+
+    def _acquire(self):
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if self._is_healthy(conn):
+                return conn
+            self._close_quietly(conn)
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            self._close_quietly(conn)
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _drain_pool(self):
+        while True:
+            try:
+                self._close_quietly(self._pool.get_nowait())
+            except queue.Empty:
+                return
+
+    @contextmanager
+    def connection(self):
+        # A healthy pooled connection; broken ones are dropped instead of returned
+        conn = self._acquire()
+        try:
+            yield conn
+        except (pymysql.OperationalError, pymysql.InterfaceError):
+            self._close_quietly(conn)
+            raise
+        except Exception:
+            conn.rollback()
+            self._release(conn)
+            raise
+        else:
+            self._release(conn)
+
+    def query(self, sql, args=None, cursorclass=pymysql.cursors.DictCursor):
+        # Retries once on a fresh connection if the pooled one died mid-query
+        for attempt in range(2):
+            try:
+                with self.connection() as conn:
+                    with conn.cursor(cursorclass) as cursor:
+                        cursor.execute(sql, args)
+                        return cursor.fetchall()
+            except (pymysql.OperationalError, pymysql.InterfaceError):
+                if attempt:
+                    raise
+                logger.warning("MySQL connection lost, retrying on a new connection")
+
+    def stream(self, sql, args=None, batch_size=5000):
+        # Unbuffered server-side cursor: yields (columns, rows) batches without holding the result set.
+        # Like query(), retries once on a fresh connection if the pooled one died, but only before
+        # the first batch: after that a retry would hand out the same rows twice.
+        for attempt in range(2):
+            conn = self._acquire()
+            started = finished = False
+            try:
+                cursor = conn.cursor(pymysql.cursors.SSCursor)
+                cursor.execute(sql, args)
+                columns = [description[0] for description in cursor.description]
+                rows = cursor.fetchmany(batch_size)
+                started = True
+                # Always yield once so callers see the columns of an empty result
+                yield columns, rows
+                while rows:
+                    rows = cursor.fetchmany(batch_size)
+                    if rows:
+                        yield columns, rows
+                cursor.close()
+                finished = True
+                return
+            except (pymysql.OperationalError, pymysql.InterfaceError):
+                if attempt or started:
+                    raise
+                logger.warning("MySQL connection lost, retrying on a new connection")
+            finally:
+                # A connection left mid-result (the caller stopped early, or an error) still has
+                # unread rows on the wire, so it is closed instead of going back to the pool
+                if finished:
+                    self._release(conn)
+                else:
+                    self._close_quietly(conn)
+
+    def read_frame(self, sql, args=None, dtypes=None, batch_size=5000):
+        # Streams the result straight into typed columns (see decode_column for dtypes)
+        dtypes = dtypes or {}
+        buffers = {}
+        for columns, rows in self.stream(sql, args, batch_size):
+            if not buffers:
+                buffers = {col: [] for col in columns}
+            for col, values in zip(columns, zip(*rows)):
+                buffers[col].append(decode_column(values, dtypes.get(col)))
+        if not any(buffers.values()):
+            return pd.DataFrame(columns=list(buffers))
+        return pd.DataFrame({col: _concat_column(chunks) for col, chunks in buffers.items()})
+
+    def close(self):
+        with self._lock:
+            self._drain_pool()
+            if self._tunnel is not None:
+                self._tunnel.stop()
+                self._tunnel = None
+
+
+def decode_column(values, dtype=None):
+    # dtype is one of 'datetime', 'float', 'int', 'category' or None (leave as object)
+    series = pd.Series(values, dtype=object)
+    if dtype == 'datetime':
+        return pd.to_datetime(series, errors='coerce')
+    if dtype == 'float':
+        return pd.to_numeric(series, errors='coerce').astype('float64')
+    if dtype == 'int':
+        return pd.to_numeric(series, errors='coerce').astype('Int64')
+    if dtype == 'category':
+        return series.astype('category')
+    return series
+
+
+def _concat_column(chunks):
+    if len(chunks) > 1 and all(isinstance(chunk.dtype, pd.CategoricalDtype) for chunk in chunks):
+        # Batches see different category sets; union them instead of falling back to object
+        return pd.Series(union_categoricals(chunks))
+    return pd.concat(chunks, ignore_index=True)
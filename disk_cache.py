@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pandas as pd
+
+import instrumentation
+
+# Disk-backed snapshots of fetched datasets so a fresh process can serve the
+# last good data immediately and refresh in the background.
+CACHE_DIR = os.environ.get("KOGNISI_CACHE_DIR", ".cache")
+DEFAULT_TTL = timedelta(hours=24)
+KEEP_VERSIONS = 3
+
+logger = logging.getLogger(__name__)
+
+_refresh_lock = threading.Lock()
+_refreshing = set()
+
+
+def _dataset_dir(name):
+    path = os.path.join(CACHE_DIR, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _prepare_for_parquet(df):
+    # MySQL returns DECIMAL columns as Decimal objects; store them as floats
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        non_null = df[col].dropna()
+        if not non_null.empty and isinstance(non_null.iloc[0], Decimal):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def _stringify_mixed(df):
+    # Sheets columns can mix numbers and text; keep nulls, stringify the rest
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def _write_frame(df, path):
+    tmp_path = path + ".tmp"
+    try:
+        _prepare_for_parquet(df).to_parquet(tmp_path, index=False)
+    except (TypeError, ValueError):
+        _stringify_mixed(_prepare_for_parquet(df)).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _write_json(data, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def _prune(path, current):
+    versions = sorted(v for v in os.listdir(path) if v.endswith(".parquet"))
+    for version in versions[:-KEEP_VERSIONS]:
+        if version != current:
+            os.remove(os.path.join(path, version))
+
+
+def save_snapshot(name, df, meta=None):
+    # Write a new version, then atomically point CURRENT at it
+    path = _dataset_dir(name)
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    filename = f"{version}.parquet"
+    _write_frame(df, os.path.join(path, filename))
+    _write_json(
+        {
+            "version": version,
+            "file": filename,
+            "saved_at": datetime.now().isoformat(),
+            "rows": len(df),
+            "meta": meta or {},
+        },
+        os.path.join(path, "CURRENT.json"),
+    )
+    _prune(path, filename)
+    return version
+
+
+def load_snapshot(name):
+    # Returns (df, info) for the current version, or (None, None) if there is none
+    current_path = os.path.join(CACHE_DIR, name, "CURRENT.json")
+    try:
+        with open(current_path) as f:
+            info = json.load(f)
+        df = pd.read_parquet(os.path.join(CACHE_DIR, name, info["file"]))
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning("Ignoring unreadable snapshot %s: %s", name, e)
+        return None, None
+    return df, info
+
+
+def move_snapshot(old_name, new_name):
+    # Moves a snapshot to a new name unless that name already has one. Only the
+    # snapshot's own files move, so a new name nested under the old one works
+    old_path = os.path.join(CACHE_DIR, old_name)
+    if not os.path.exists(os.path.join(old_path, "CURRENT.json")):
+        return False
+    if os.path.exists(os.path.join(CACHE_DIR, new_name, "CURRENT.json")):
+        return False
+    new_path = _dataset_dir(new_name)
+    for filename in os.listdir(old_path):
+        if filename.endswith(".parquet"):
+            os.replace(os.path.join(old_path, filename), os.path.join(new_path, filename))
+    os.replace(os.path.join(old_path, "CURRENT.json"), os.path.join(new_path, "CURRENT.json"))
+    try:
+        os.rmdir(old_path)
+    except OSError:
+        pass
+    return True
+
+
+def snapshot_age(info):
+    return datetime.now() - datetime.fromisoformat(info["saved_at"])
+
+
+def clear_snapshots(name=None):
+    shutil.rmtree(os.path.join(CACHE_DIR, name) if name else CACHE_DIR, ignore_errors=True)
+
+
+def refresh(name, loader, meta=None):
+    df = loader()
+    save_snapshot(name, df, meta() if meta else None)
+    return df
+
+
+def refresh_in_background(name, loader, meta=None):
+    # At most one refresh per dataset in flight
+    with _refresh_lock:
+        if name in _refreshing:
+            return
+        _refreshing.add(name)
+
+    def run():
+        try:
+            refresh(name, loader, meta)
+        except Exception:
+            logger.exception("Background refresh of %s failed", name)
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(name)
+
+    threading.Thread(target=run, name=f"refresh-{name}", daemon=True).start()
+
+
+def cached_load(name, loader, ttl=DEFAULT_TTL, meta=None):
+    # Serve the last good snapshot right away; refresh it in the background once stale
+    df, info = load_snapshot(name)
+    instrumentation.cache_result(f"disk.{name}", hit=df is not None)
+    if df is not None:
+        if snapshot_age(info) > ttl:
+            instrumentation.count('disk_cache_stale_refreshes', dataset=name)
+            refresh_in_background(name, loader, meta)
+        return df
+    return refresh(name, loader, meta)
@@ -0,0 +1,118 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Persistent email -> employee index over the BPJS sheet. Each employee keeps
+# a stable integer key across refreshes; sheet changes are applied as a diff
+# and transactions are joined by hashed key lookup instead of a full merge.
+logger = logging.getLogger(__name__)
+
+SUFFIXES = ('_id', '_bpjs')
+UNMATCHED_SAMPLE = 20
+
+
+class EmailIndex:
+    def __init__(self):
+        self.employees = pd.DataFrame()  # indexed by key, one row per email
+        self.keys = pd.Index([], dtype=object)  # email at position i has key self.key_values[i]
+        self.key_values = np.array([], dtype=np.int64)
+        self.next_key = 0
+        self.last_diff = None
+        self.last_report = None
+
+    def __len__(self):
+        return len(self.employees)
+
+    def update(self, df_bpjs):
+        # Apply the sheet as a diff: added, removed and changed employees
+        sheet = df_bpjs[df_bpjs['email'].notnull()]
+        duplicates = int(sheet['email'].duplicated().sum())
+        sheet = sheet.drop_duplicates(subset='email', keep='last').set_index('email')
+
+        if self.employees.empty or list(self.employees.columns) != ['email'] + list(sheet.columns):
+            # First load or the sheet's columns changed: rebuild with fresh keys
+            added, removed, changed = sheet.index, pd.Index([]), pd.Index([])
+            self.employees = pd.DataFrame(columns=['email'] + list(sheet.columns))
+            self.keys = pd.Index([], dtype=object)
+            self.key_values = np.array([], dtype=np.int64)
+        else:
+            current = self.employees.set_index('email')
+            added = sheet.index.difference(current.index)
+            removed = current.index.difference(sheet.index)
+            common = sheet.index.intersection(current.index)
+            old, new = current.loc[common, sheet.columns], sheet.loc[common]
+            differs = ~((old == new) | (old.isnull() & new.isnull())).all(axis=1)
+            changed = common[differs.to_numpy()]
+
+        if len(removed):
+            removed_keys = self.key_values[self.keys.get_indexer(removed)]
+            self.employees = self.employees.drop(index=removed_keys)
+        if len(changed):
+            changed_keys = self.key_values[self.keys.get_indexer(changed)]
+            self.employees.loc[changed_keys, sheet.columns] = sheet.loc[changed].to_numpy()
+        if len(added):
+            new_keys = np.arange(self.next_key, self.next_key + len(added), dtype=np.int64)
+            self.next_key += len(added)
+            new_rows = sheet.loc[added].reset_index().set_index(pd.Index(new_keys))
+            self.employees = pd.concat([self.employees, new_rows]) if len(self.employees) else new_rows
+
+        # Rebuild the hash lookup over the live employees
+        self.keys = pd.Index(self.employees['email'].to_numpy(), dtype=object)
+        self.key_values = self.employees.index.to_numpy(dtype=np.int64)
+        self.last_diff = {
+            'added': len(added),
+            'removed': len(removed),
+            'changed': len(changed),
+            'duplicate_emails': duplicates,
+        }
+        return self.last_diff
+
+    def lookup(self, emails):
+        # Employee key per email, -1 when the email is not in the sheet
+        positions = self.keys.get_indexer(emails)
+        return np.where(positions >= 0, self.key_values[positions], -1)
+
+    def join(self, df_id):
+        # Outer join of transactions with employees: transactions in their own
+        # order, then one row per employee without any transaction
+        positions = self.keys.get_indexer(df_id['email'])
+        matched = positions >= 0
+        used = np.zeros(len(self.employees), dtype=bool)
+        used[positions[matched]] = True
+        idle = np.flatnonzero(~used)
+        # Position -1 reindexes to an empty row on either side
+        left_rows = np.concatenate([np.arange(len(df_id)), np.full(len(idle), -1)])
+        right_rows = np.concatenate([positions, idle])
+
+        employee_cols = [col for col in self.employees.columns if col != 'email']
+        overlap = set(employee_cols) & set(df_id.columns)
+        # Positional indexes and suffixed names are set on shallow copies, so
+        # each side's data is copied once, by reindex
+        combined = df_id.copy(deep=False)
+        combined.index = pd.RangeIndex(len(combined))
+        combined.columns = [col + SUFFIXES[0] if col in overlap else col for col in combined.columns]
+        combined = combined.reindex(left_rows)
+        combined.index = pd.RangeIndex(len(combined))
+        combined['email'] = np.concatenate([df_id['email'].to_numpy(), self.employees['email'].to_numpy()[idle]])
+        employees = self.employees[employee_cols]
+        employees.index = pd.RangeIndex(len(employees))
+        employees = employees.reindex(right_rows)
+        # Added column by column, without consolidating the transaction columns again
+        for col in employee_cols:
+            combined[col + SUFFIXES[1] if col in overlap else col] = employees[col].array
+
+        unmatched = df_id.loc[~matched, 'email'].dropna().unique()
+        self.last_report = {
+            'transactions': len(df_id),
+            'matched_transactions': int(matched.sum()),
+            'unmatched_transactions': int((~matched).sum()),
+            'unmatched_transaction_emails': len(unmatched),
+            'unmatched_transaction_sample': list(unmatched[:UNMATCHED_SAMPLE]),
+            'employees': len(self.employees),
+            'employees_without_transactions': len(idle),
+        }
+        if self.last_diff:
+            self.last_report.update(self.last_diff)
+        logger.info("email join: %s", self.last_report)
+        return combined
@@ -0,0 +1,217 @@
+# Server-side exports of the filtered data. Rows are taken from the shared
+# snapshot chunk by chunk and written straight to the output, so an export
+# never holds more than one chunk-sized copy of the selection. Per-wilayah
+# reports for scheduled distribution are written in parallel worker processes.
+#
+#   python -m export --output reports --format xlsx
+
+import argparse
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CHUNK_ROWS = 50000
+XLSX_MAX_ROWS = 1048576  # per sheet, header included
+REPORT_WORKERS = 4
+
+FORMATS = {
+    'csv': {'extension': 'csv', 'mime': 'text/csv'},
+    'parquet': {'extension': 'parquet', 'mime': 'application/octet-stream'},
+    'xlsx': {'extension': 'xlsx', 'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'},
+}
+
+USER_PROGRESS_COLUMNS = ['nama', 'email', 'unit_kerja', 'title', 'updated_at', 'status', 'enroll_date', 'voucher']
+
+
+def user_progress_rows(df, rows=None):
+    # Positions of the "All User Progress" rows: the selection minus rows without a title
+    rows = np.arange(len(df)) if rows is None else np.asarray(rows)
+    return rows[df['title'].notnull().to_numpy()[rows]] if 'title' in df.columns else rows
+
+
+def adoption_table(df, by='wilayah'):
+    # Users, enrolled users and users with 100% progress per value of `by`
+    users = df.groupby(by, observed=True)['email'].nunique()
+    enrolled = df[df['no_transaksi'].notnull()].groupby(by, observed=True)['email'].nunique()
+    completed = df[df['progress'] == 100].groupby(by, observed=True)['email'].nunique()
+    table = pd.DataFrame({'user': users, 'enrollment': enrolled, 'progress_100%': completed}).fillna(0).astype(int)
+    table['learning_adoption'] = (table['enrollment'] / table['user']).round(2)
+    return table.sort_values(by='user', ascending=False).reset_index()
+
+
+def iter_chunks(df, rows=None, columns=None, chunk_rows=CHUNK_ROWS):
+    frame = df[columns] if columns else df
+    rows = np.arange(len(df)) if rows is None else np.asarray(rows)
+    for start in range(0, len(rows), chunk_rows):
+        yield frame.take(rows[start:start + chunk_rows])
+    if len(rows) == 0:
+        yield frame.iloc[:0]
+
+
+def write_csv(df, target, rows=None, columns=None, chunk_rows=CHUNK_ROWS):
+    text = io.TextIOWrapper(target, encoding='utf-8', newline='', write_through=True)
+    for i, chunk in enumerate(iter_chunks(df, rows, columns, chunk_rows)):
+        chunk.to_csv(text, index=False, header=i == 0)
+    text.detach()
+
+
+def parquet_schema(df):
+    # Taken from the dtypes of the whole frame, not the first chunk's values, so
+    # a text column that happens to be null throughout that chunk stays string
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    for i, col in enumerate(df.columns):
+        if df[col].dtype == object:
+            schema = schema.set(i, pa.field(col, pa.string()))
+    return schema
+
+
+def write_parquet(df, target, rows=None, columns=None, chunk_rows=CHUNK_ROWS):
+    schema = parquet_schema(df[columns] if columns else df)
+    with pq.ParquetWriter(target, schema) as writer:
+        for chunk in iter_chunks(df, rows, columns, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _xlsx_values(chunk):
+    # Column-wise conversion to values xlsxwriter understands; blanks for nulls
+    columns = []
+    for col in chunk.columns:
+        values = chunk[col]
+        if pd.api.types.is_datetime64_any_dtype(values.dtype):
+            values = values.dt.tz_localize(None) if values.dt.tz is not None else values
+            values = values.astype(object).where(values.notnull(), None)
+            values = [value.to_pydatetime() if value is not None else None for value in values]
+        else:
+            values = values.astype(object).where(values.notnull(), None).tolist()
+        columns.append(values)
+    return zip(*columns)
+
+
+def write_xlsx(df, target, rows=None, columns=None, chunk_rows=CHUNK_ROWS, sheet='Data', workbook=None):
+    # Pass an open workbook to add several sheets to one file
+    import xlsxwriter
+
+    own = workbook is None
+    if own:
+        workbook = xlsxwriter.Workbook(target, {'constant_memory': True, 'in_memory': False})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+    header = list(columns or df.columns)
+    worksheet, row_number, part = None, XLSX_MAX_ROWS, 0
+    for chunk in iter_chunks(df, rows, columns, chunk_rows):
+        for values in _xlsx_values(chunk):
+            if row_number >= XLSX_MAX_ROWS:
+                # Continue on a new sheet once the row limit is reached
+                part += 1
+                worksheet = workbook.add_worksheet(sheet if part == 1 else f"{sheet} ({part})")
+                worksheet.write_row(0, 0, header)
+                row_number = 1
+            for col_number, value in enumerate(values):
+                if value is None:
+                    continue
+                if hasattr(value, 'year'):
+                    worksheet.write_datetime(row_number, col_number, value, date_format)
+                elif isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+                    worksheet.write_number(row_number, col_number, float(value))
+                else:
+                    worksheet.write_string(row_number, col_number, str(value))
+            row_number += 1
+    if worksheet is None:
+        workbook.add_worksheet(sheet).write_row(0, 0, header)
+    if own:
+        workbook.close()
+
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet, 'xlsx': write_xlsx}
+
+
+def export(df, fmt, target, rows=None, columns=None, chunk_rows=CHUNK_ROWS):
+    # target is a path or a binary file object
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, 'wb') as f:
+            return export(df, fmt, f, rows, columns, chunk_rows)
+    WRITERS[fmt](df, target, rows=rows, columns=columns, chunk_rows=chunk_rows)
+    return target
+
+
+def export_bytes(df, fmt, rows=None, columns=None, chunk_rows=CHUNK_ROWS):
+    buffer = io.BytesIO()
+    export(df, fmt, buffer, rows, columns, chunk_rows)
+    return buffer.getvalue()
+
+
+def _safe_name(value):
+    return re.sub(r'[^\w.-]+', '_', str(value)).strip('_') or 'unknown'
+
+
+def _write_report(wilayah, df, output_dir, fmt):
+    # One wilayah: adoption per unit_kerja plus the user progress list
+    adoption = adoption_table(df, 'unit_kerja')
+    progress_rows = user_progress_rows(df)
+    columns = [col for col in USER_PROGRESS_COLUMNS if col in df.columns]
+    name = _safe_name(wilayah)
+    if fmt == 'xlsx':
+        import xlsxwriter
+
+        path = os.path.join(output_dir, f"{name}.xlsx")
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        write_xlsx(adoption, None, sheet='Adoption', workbook=workbook)
+        write_xlsx(df, None, rows=progress_rows, columns=columns, sheet='User Progress', workbook=workbook)
+        workbook.close()
+        return [path]
+    extension = FORMATS[fmt]['extension']
+    paths = [
+        os.path.join(output_dir, f"{name}_adoption.{extension}"),
+        os.path.join(output_dir, f"{name}_user_progress.{extension}"),
+    ]
+    export(adoption, fmt, paths[0])
+    export(df, fmt, paths[1], rows=progress_rows, columns=columns)
+    return paths
+
+
+def build_reports(df, output_dir, fmt='xlsx', wilayah=None, workers=REPORT_WORKERS):
+    # Per-wilayah report files, written by a pool of worker processes
+    os.makedirs(output_dir, exist_ok=True)
+    codes, values = pd.factorize(df['wilayah'])
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+    jobs = [
+        (value, df.take(order[bounds[i]:bounds[i + 1]]))
+        for i, value in enumerate(values)
+        if not wilayah or value in wilayah
+    ]
+    paths = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {value: pool.submit(_write_report, value, part, output_dir, fmt) for value, part in jobs}
+        for value, future in futures.items():
+            paths[value] = future.result()
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write per-wilayah adoption and user progress reports")
+    parser.add_argument('--output', default='reports')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='xlsx')
+    parser.add_argument('--wilayah', action='append', help="only these wilayah (repeatable)")
+    parser.add_argument('--workers', type=int, default=REPORT_WORKERS)
+    parser.add_argument('--programme', help="programme key from the secrets; defaults to the first one")
+    args = parser.parse_args()
+
+    from data_processing import fetch_combined
+    from schema import compact
+
+    df_combined, _ = fetch_combined(args.programme)
+    if df_combined is None:
+        raise SystemExit("One or both dataframes are missing the 'email' column.")
+    paths = build_reports(compact(df_combined), args.output, args.format, args.wilayah, args.workers)
+    for value, files in paths.items():
+        print(f"{value}: {', '.join(files)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,73 +1,209 @@
 import streamlit as st
 import pandas as pd
-import pymysql
-from sshtunnel import SSHTunnelForwarder
-import paramiko
-from io import StringIO
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import toml
+import threading
+from datetime import datetime, timedelta
+import disk_cache
+from db import ConnectionManager, load_private_key
+from sheet_sync import SheetMirror
+import instrumentation
+from programmes import DEFAULT_PROGRAMME, get_programme
 
-@st.cache_resource(ttl=86400)
-def fetch_data_id():
-    try:
-        # Load the private key content from secrets for ID
-        private_key_content = st.secrets["key_id"]["id_rsa_streamlit"]
-        private_key_passphrase = st.secrets["ssh_id"].get("private_key_passphrase")
-        
-        # Create an RSA key object from the private key content for ID
-        private_key_file = StringIO(private_key_content)
-        private_key = paramiko.RSAKey.from_private_key(private_key_file, password=private_key_passphrase)
-
-        with SSHTunnelForwarder(
-            (st.secrets["ssh_id"]["host"], st.secrets["ssh_id"]["port"]),
-            ssh_username=st.secrets["ssh_id"]["username"],
-            ssh_pkey=private_key,
-            remote_bind_address=(st.secrets["id"]["host"], st.secrets["id"]["port"]),
-        ) as tunnel:
-            connection_kwargs = {
-                'host': '127.0.0.1',
-                'port': tunnel.local_bind_port if tunnel.is_active else st.secrets["id"]["port"],
-                'user': st.secrets["id"]["user"],
-                'password': st.secrets["id"]["password"],
-                'database': st.secrets["id"]["database"],
-                'cursorclass': pymysql.cursors.DictCursor,
-            }
-            conn = pymysql.connect(**connection_kwargs)
-
-            with open('query_id.sql', 'r') as sql_file:
-                query = sql_file.read()
-
-            cursor = conn.cursor()
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            return pd.DataFrame(rows)
-    except Exception as e:
-        st.error(f"An error occurred while fetching data from ID: {e}")
-        return pd.DataFrame()
-
-@st.cache_resource(ttl=86400)
-def fetch_bpjs():
-    secret_info = st.secrets["sheets"]
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(secret_info, scope)
-    client = gspread.authorize(creds)
-    spreadsheet = client.open('Kognisi x BPJS')
-    sheet = spreadsheet.sheet1
-    data = sheet.get_all_records()
-    df = pd.DataFrame(data)
+# Incremental sync settings for the ID transactions snapshot
+FULL_SYNC_SINCE = datetime(1970, 1, 1)
+WATERMARK_OVERLAP = timedelta(minutes=10)  # re-read a small window to absorb late commits
+FULL_SYNC_INTERVAL = timedelta(days=7)  # periodic full pull to pick up edits the watermark can't see
+
+# Disk snapshots are refreshed from the sources after DISK_TTL; memory only fronts the disk copy
+DISK_TTL = timedelta(hours=24)
+MEMORY_TTL = 300
+
+# Sheets are only re-read when their modifiedTime moves, so they can be checked often
+SHEETS_DISK_TTL = timedelta(minutes=15)
+
+# Column types for query_id.sql results, decoded while streaming
+FETCH_BATCH_SIZE = 5000
+QUERY_ID_DTYPES = {
+    'enroll_date': 'datetime',
+    'created_at': 'datetime',
+    'updated_at': 'datetime',
+    'price': 'float',
+    'progress': 'float',
+    'duration': 'float',
+    'total_correct_answers': 'float',
+    'pre_test': 'float',
+    'post_test': 'float',
+    'voucher': 'category',
+    'category_name': 'category',
+    'status': 'category',
+}
+
+@st.cache_resource
+def get_db():
+    # Tunnel and connection pool live for the whole process; set use_tunnel = false
+    # under [id] to talk to a local MySQL directly
+    db_config = {
+        'host': st.secrets["id"]["host"],
+        'port': st.secrets["id"]["port"],
+        'user': st.secrets["id"]["user"],
+        'password': st.secrets["id"]["password"],
+        'database': st.secrets["id"]["database"],
+    }
+    ssh_config = None
+    if st.secrets["id"].get("use_tunnel", True):
+        ssh_config = {
+            'host': st.secrets["ssh_id"]["host"],
+            'port': st.secrets["ssh_id"]["port"],
+            'username': st.secrets["ssh_id"]["username"],
+            'pkey': load_private_key(
+                st.secrets["key_id"]["id_rsa_streamlit"],
+                st.secrets["ssh_id"].get("private_key_passphrase"),
+            ),
+        }
+    return ConnectionManager(db_config, ssh_config, pool_size=st.secrets["id"].get("pool_size", 3))
+
+@st.cache_resource
+def _migrate_legacy_snapshots():
+    # Snapshots written before the per-programme partitions sat at the top of
+    # the cache dir and hold the BPJS programme's data
+    for dataset in ('data_id', 'bpjs', 'creds'):
+        if disk_cache.move_snapshot(dataset, f"{DEFAULT_PROGRAMME.key}/{dataset}"):
+            instrumentation.count('disk_cache_migrated_snapshots', dataset=dataset)
+
+def _snapshot_name(programme, dataset):
+    # Disk snapshots are partitioned per programme
+    _migrate_legacy_snapshots()
+    return f"{programme}/{dataset}"
+
+def _query_data_id(since, vouchers):
+    with open('query_id.sql', 'r') as sql_file:
+        query = sql_file.read()
+
+    params = {'since': since, 'vouchers': tuple(vouchers)}
+    with instrumentation.span('fetch.id.query') as span:
+        df = get_db().read_frame(query, params, dtypes=QUERY_ID_DTYPES, batch_size=FETCH_BATCH_SIZE)
+        span.set_frame(df)
     return df
 
-@st.cache_resource(ttl=86400)
-def fetch_creds():
+def _high_water_mark(df):
+    # Latest transaction or progress timestamp seen in the snapshot
+    marks = [
+        pd.to_datetime(df[col], errors='coerce').max()
+        for col in ('enroll_date', 'updated_at') if col in df.columns
+    ]
+    marks = [mark for mark in marks if pd.notnull(mark)]
+    return max(marks).to_pydatetime() if marks else None
+
+def merge_delta(snapshot, delta):
+    # Newer rows win for transactions present in both
+    if delta.empty:
+        return snapshot
+    if snapshot is None or snapshot.empty:
+        return delta.reset_index(drop=True)
+    merged = pd.concat([snapshot, delta], ignore_index=True)
+    merged = merged.drop_duplicates(subset='no_transaksi', keep='last').reset_index(drop=True)
+    # concat falls back to object when category sets differ
+    for col, dtype in QUERY_ID_DTYPES.items():
+        if dtype == 'category' and col in merged.columns:
+            merged[col] = merged[col].astype('category')
+    return merged
+
+@st.cache_resource
+def _id_sync_state(programme):
+    # Local snapshot of the programme's query_id.sql rows kept across cache expiries, seeded from disk on boot
+    vouchers = sorted(get_programme(programme).vouchers)
+    state = {'df': None, 'watermark': None, 'last_full_sync': None, 'vouchers': vouchers, 'lock': threading.Lock()}
+    df, info = disk_cache.load_snapshot(_snapshot_name(programme, 'data_id'))
+    meta = info['meta'] if info else {}
+    # A snapshot taken with a different voucher set can't be topped up incrementally
+    if df is not None and meta.get('watermark') and meta.get('last_full_sync') and meta.get('vouchers') == vouchers:
+        state['df'] = df
+        state['watermark'] = datetime.fromisoformat(meta['watermark'])
+        state['last_full_sync'] = datetime.fromisoformat(meta['last_full_sync'])
+    return state
+
+def _id_sync_meta(programme):
+    state = _id_sync_state(programme)
+    return {
+        'watermark': state['watermark'].isoformat() if state['watermark'] else None,
+        'last_full_sync': state['last_full_sync'].isoformat() if state['last_full_sync'] else None,
+        'vouchers': state['vouchers'],
+    }
+
+def sync_data_id(programme, full=False):
+    state = _id_sync_state(programme)
+    with state['lock']:
+        now = datetime.now()
+        needs_full = (
+            full
+            or state['df'] is None
+            or state['watermark'] is None
+            or now - state['last_full_sync'] >= FULL_SYNC_INTERVAL
+        )
+        if needs_full:
+            df = _query_data_id(FULL_SYNC_SINCE, state['vouchers'])
+            state['last_full_sync'] = now
+        else:
+            delta = _query_data_id(state['watermark'] - WATERMARK_OVERLAP, state['vouchers'])
+            df = merge_delta(state['df'], delta)
+
+        state['df'] = df
+        state['watermark'] = _high_water_mark(df) or state['watermark']
+        return df
+
+# In-memory caches only hold the disk snapshot briefly so background refreshes show up quickly
+# Errors propagate so the combined fetch can report them per source
+@st.cache_resource(ttl=MEMORY_TTL)
+def fetch_data_id(programme):
+    return disk_cache.cached_load(
+        _snapshot_name(programme, 'data_id'),
+        lambda: sync_data_id(programme),
+        DISK_TTL,
+        meta=lambda: _id_sync_meta(programme),
+    )
+
+# Re-authorize well within the one-hour service account token lifetime
+@st.cache_resource(ttl=3000)
+def _spreadsheet(name):
+    # One authorized gspread client and one open() per spreadsheet, shared by its worksheet loaders
     secret_info = st.secrets["sheets"]
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
     creds = ServiceAccountCredentials.from_json_keyfile_dict(secret_info, scope)
     client = gspread.authorize(creds)
-    spreadsheet = client.open('Kognisi x BPJS')
-    sheet = spreadsheet.worksheet('creds')
-    data = sheet.get_all_records()
-    df = pd.DataFrame(data)
+    return client.open(name)
+
+@st.cache_resource
+def _sheet_mirror(programme, dataset):
+    # Kept for the whole process so unchanged sheets and row blocks are never re-parsed
+    config = get_programme(programme)
+    worksheet = config.creds_worksheet if dataset == 'creds' else config.roster_worksheet
+    mirror = SheetMirror(lambda: _spreadsheet(config.spreadsheet), worksheet)
+    df, info = disk_cache.load_snapshot(_snapshot_name(programme, dataset))
+    if info:
+        mirror.seed(df, info['meta'].get('modified_time'))
+    return mirror
+
+def _read_sheet(programme, dataset):
+    with instrumentation.span(f"fetch.sheets.{dataset}") as span:
+        df = _sheet_mirror(programme, dataset).read()
+        span.set_frame(df)
     return df
+
+def _load_sheet(programme, dataset):
+    return disk_cache.cached_load(
+        _snapshot_name(programme, dataset),
+        lambda: _read_sheet(programme, dataset),
+        SHEETS_DISK_TTL,
+        meta=lambda: _sheet_mirror(programme, dataset).meta(),
+    )
+
+@st.cache_resource(ttl=MEMORY_TTL)
+def fetch_bpjs(programme):
+    # The programme's employee roster (the BPJS sheet for the default programme)
+    return _load_sheet(programme, 'bpjs')
+
+@st.cache_resource(ttl=MEMORY_TTL)
+def fetch_creds(programme):
+    return _load_sheet(programme, 'creds')
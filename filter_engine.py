@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# Sidebar filter engine built once per data snapshot. Dates are parsed once
+# into day numbers, categorical columns are dictionary-encoded with a packed
+# row bitmap per value, and names get a trigram index over the distinct
+# lowercased names. select() returns row positions instead of frame copies.
+NGRAM = 3
+NO_DATE = np.iinfo(np.int64).min
+CATEGORICAL_FILTERS = ['wilayah', 'category_name', 'voucher']
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class FilterEngine:
+    def __init__(self, df):
+        self.n_rows = len(df)
+
+        # Day number per row; rows without an enroll date get NO_DATE
+        if 'enroll_date' in df.columns:
+            days = pd.to_datetime(df['enroll_date'], errors='coerce').dt.normalize()
+            self.days = np.where(days.isnull(), NO_DATE, days.to_numpy(dtype='datetime64[D]').astype(np.int64))
+        else:
+            self.days = None
+
+        # Packed row bitmap per distinct value
+        self.bitmaps = {}
+        for col in CATEGORICAL_FILTERS:
+            if col not in df.columns:
+                continue
+            codes, values = pd.factorize(df[col])
+            self.bitmaps[col] = {
+                value: np.packbits(codes == code) for code, value in enumerate(values)
+            }
+
+        # Names are searched over their distinct lowercased values, then mapped back to rows
+        if 'nama' in df.columns:
+            self.name_codes, names = pd.factorize(df['nama'].astype('string').str.lower())
+            self.names = np.asarray(names, dtype=object)
+            index = {}
+            for code, name in enumerate(self.names):
+                for gram in _ngrams(name):
+                    index.setdefault(gram, []).append(code)
+            self.name_index = {gram: np.array(codes) for gram, codes in index.items()}
+        else:
+            self.name_codes = None
+
+    def _empty(self):
+        return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+
+    def _full(self):
+        return np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def _match_names(self, text):
+        # Distinct name codes containing text (case-insensitive, literal)
+        text = text.lower()
+        grams = _ngrams(text)
+        if grams:
+            candidates = None
+            for gram in grams:
+                codes = self.name_index.get(gram)
+                if codes is None:
+                    return np.array([], dtype=np.int64)
+                candidates = codes if candidates is None else np.intersect1d(candidates, codes)
+        else:
+            candidates = np.arange(len(self.names))
+        return np.array([code for code in candidates if text in self.names[code]], dtype=np.int64)
+
+    def _values_bitmap(self, col, values):
+        bitmap = self._empty()
+        for value in values:
+            value_bitmap = self.bitmaps.get(col, {}).get(value)
+            if value_bitmap is not None:
+                bitmap |= value_bitmap
+        return bitmap
+
+    def mask(self, name=None, date_range=None, wilayah=None, categories=None, voucher=None):
+        selected = self._full()
+        if name:
+            if self.name_codes is None:
+                return np.zeros(self.n_rows, dtype=bool)
+            selected &= np.packbits(np.isin(self.name_codes, self._match_names(name)))
+        if date_range and self.days is not None:
+            start = np.datetime64(pd.to_datetime(date_range[0]).date(), 'D').astype(np.int64)
+            end = np.datetime64(pd.to_datetime(date_range[1]).date(), 'D').astype(np.int64)
+            # Rows without an enroll date are always kept
+            selected &= np.packbits((self.days == NO_DATE) | ((self.days >= start) & (self.days <= end)))
+        if wilayah:
+            selected &= self._values_bitmap('wilayah', wilayah)
+        if categories:
+            selected &= self._values_bitmap('category_name', categories)
+        if voucher and voucher != "All":
+            selected &= self._values_bitmap('voucher', [voucher])
+        return np.unpackbits(selected, count=self.n_rows).astype(bool)
+
+    def select(self, **filters):
+        # Row positions matching the filters
+        return np.flatnonzero(self.mask(**filters))
@@ -0,0 +1,28 @@
+-- Index recommendations for query_id.sql on the ID MySQL database.
+-- Review against the existing indexes (SHOW INDEX FROM <table>) before applying;
+-- MySQL has no CREATE INDEX IF NOT EXISTS.
+
+-- Transaction filter and the incremental watermark
+CREATE INDEX idx_transactions_voucher_status_created
+    ON transactions (voucher_serial, status, created_at);
+CREATE INDEX idx_transactions_user_course
+    ON transactions (user_serial, course_serial);
+
+-- Voucher lookup by code
+CREATE INDEX idx_vouchers_code ON vouchers (code);
+
+-- Enrollment lookup per transaction
+CREATE INDEX idx_course_users_course_user
+    ON course_users (course_serial, user_serial, is_accomplished);
+
+-- Covering index for the per-(user, course) progress aggregate and the watermark EXISTS
+CREATE INDEX idx_cup_user_course_covering
+    ON course_user_progress (user_serial, course_serial, updated_at, created_at,
+                             progress_percentage, progress_duration, score);
+
+-- Pre/post test detection per course
+CREATE INDEX idx_course_contents_course ON course_contents (course_serial);
+
+-- Quiz answer totals per (user, course)
+CREATE INDEX idx_cuqa_user_course_correct
+    ON course_user_quiz_answers (user_serial, course_serial, is_correct);
@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+import streamlit as st
+
+# Hot-path instrumentation: timed spans with row/byte counts and peak memory,
+# plus labelled counters (cache hits and misses). Everything is kept in one
+# process-wide registry, exported as Prometheus text and logged as one JSON
+# line per span. Off unless KOGNISI_INSTRUMENTATION is set; when off, span()
+# hands back a shared no-op and count() returns straight away.
+ENABLED = os.environ.get("KOGNISI_INSTRUMENTATION", "").lower() not in ("", "0", "false", "no")
+METRIC_PREFIX = "kognisi"
+
+logger = logging.getLogger(__name__)
+
+# ru_maxrss is in KiB on Linux and bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def _peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, rows=None, nbytes=None):
+        pass
+
+    def set_frame(self, df):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.rows = None
+        self.nbytes = None
+
+    def __enter__(self):
+        self.rss_before = _peak_rss()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        peak = _peak_rss()
+        self.registry.observe(
+            self.name, seconds, self.rows, self.nbytes, peak, peak - self.rss_before, error=exc_type is not None,
+        )
+        return False
+
+    def set(self, rows=None, nbytes=None):
+        if rows is not None:
+            self.rows = (self.rows or 0) + rows
+        if nbytes is not None:
+            self.nbytes = (self.nbytes or 0) + nbytes
+
+    def set_frame(self, df):
+        # Shallow size: cheap enough for the hot path
+        if df is not None:
+            self.set(rows=len(df), nbytes=int(df.memory_usage(deep=False).sum()))
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = defaultdict(int)
+
+    def observe(self, name, seconds, rows=None, nbytes=None, peak_rss=None, rss_growth=None, error=False):
+        with self._lock:
+            stage = self.stages.setdefault(name, {
+                'count': 0, 'errors': 0, 'seconds_total': 0.0, 'seconds_max': 0.0, 'seconds_last': 0.0,
+                'rows_total': 0, 'bytes_total': 0, 'peak_rss_bytes': 0, 'rss_growth_bytes': 0,
+            })
+            stage['count'] += 1
+            stage['errors'] += int(error)
+            stage['seconds_total'] += seconds
+            stage['seconds_max'] = max(stage['seconds_max'], seconds)
+            stage['seconds_last'] = seconds
+            stage['rows_total'] += rows or 0
+            stage['bytes_total'] += nbytes or 0
+            stage['peak_rss_bytes'] = max(stage['peak_rss_bytes'], peak_rss or 0)
+            stage['rss_growth_bytes'] = max(stage['rss_growth_bytes'], rss_growth or 0)
+        logger.info(json.dumps({
+            'event': 'span', 'stage': name, 'seconds': round(seconds, 6), 'rows': rows, 'bytes': nbytes,
+            'peak_rss_bytes': peak_rss, 'error': error,
+        }))
+
+    def count(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += amount
+
+    def stage_table(self):
+        with self._lock:
+            return {name: dict(stage) for name, stage in self.stages.items()}
+
+    def counter_table(self):
+        with self._lock:
+            return {key: value for key, value in self.counters.items()}
+
+    def prometheus(self):
+        def escape(value):
+            # Label values escape backslash, double quote and newline in the text format
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def labels(pairs):
+            return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in pairs) + "}" if pairs else ""
+
+        lines = []
+        stages = self.stage_table()
+        for metric, field, kind in [
+            ('stage_seconds_total', 'seconds_total', 'counter'),
+            ('stage_seconds_max', 'seconds_max', 'gauge'),
+            ('stage_calls_total', 'count', 'counter'),
+            ('stage_errors_total', 'errors', 'counter'),
+            ('stage_rows_total', 'rows_total', 'counter'),
+            ('stage_bytes_total', 'bytes_total', 'counter'),
+            ('stage_peak_rss_bytes', 'peak_rss_bytes', 'gauge'),
+            ('stage_rss_growth_bytes', 'rss_growth_bytes', 'gauge'),
+        ]:
+            lines.append(f"# TYPE {METRIC_PREFIX}_{metric} {kind}")
+            for name, stage in sorted(stages.items()):
+                lines.append(f"{METRIC_PREFIX}_{metric}{labels([('stage', name)])} {stage[field]}")
+        counters = defaultdict(list)
+        for (name, pairs), value in sorted(self.counter_table().items()):
+            counters[name].append((pairs, value))
+        for name, series in counters.items():
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+            for pairs, value in series:
+                lines.append(f"{METRIC_PREFIX}_{name}_total{labels(pairs)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def span(name):
+    # with span('fetch.id') as s: ...; s.set(rows=len(df), nbytes=...)
+    return Span(registry, name) if ENABLED else _NOOP_SPAN
+
+
+def count(name, amount=1, **labels):
+    if ENABLED:
+        registry.count(name, amount, **labels)
+
+
+def cache_result(cache, hit):
+    count('cache_requests', cache=cache, result='hit' if hit else 'miss')
+
+
+def is_admin(username):
+    # Admins are listed under [admin] usernames = [...] in the secrets
+    return ENABLED and username in st.secrets.get("admin", {}).get("usernames", [])
+
+
+def admin_panel():
+    with st.sidebar.expander("Performance"):
+        stages = pd.DataFrame.from_dict(registry.stage_table(), orient='index')
+        if not stages.empty:
+            stages['seconds_avg'] = stages['seconds_total'] / stages['count']
+            st.dataframe(stages.sort_values('seconds_total', ascending=False))
+        counters = pd.DataFrame(
+            [{'counter': name, **dict(pairs), 'value': value} for (name, pairs), value in registry.counter_table().items()]
+        )
+        if not counters.empty:
+            st.dataframe(counters)
+        st.download_button("Prometheus metrics", registry.prometheus(), file_name="metrics.prom", mime="text/plain")
+        if st.button("Reset metrics"):
+            registry.reset()
@@ -0,0 +1,97 @@
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Budget ledger of a programme's transactions. Every SUCCEEDED transaction
+# (a query_id.sql row) is recorded once under its no_transaksi, taken from the
+# transaction rows before the email join so repeated roster rows can't double
+# count. Each sync applies only the difference to the running total and the
+# per-day buckets, and the summary the page reads is computed once per sync.
+BURN_WINDOW_DAYS = 30  # trailing window the burn rate is measured over
+PERIOD_DAYS = {'day': 1, 'week': 7, 'month': 30}
+
+
+def _entries(df_id):
+    # One (day, price) entry per transaction; later rows win for repeated numbers
+    if df_id is None or df_id.empty or 'no_transaksi' not in df_id.columns:
+        return pd.DataFrame({'day': pd.Series(dtype='datetime64[ns]'), 'price': pd.Series(dtype=float)})
+    df = df_id[df_id['no_transaksi'].notnull()]
+    df = df.drop_duplicates(subset='no_transaksi', keep='last')
+    days = pd.to_datetime(df['enroll_date'], errors='coerce')
+    days = days.dt.tz_localize(None) if days.dt.tz is not None else days
+    return pd.DataFrame({
+        'day': days.dt.normalize().to_numpy(),
+        'price': pd.to_numeric(df['price'], errors='coerce').fillna(0).to_numpy(dtype=float),
+    }, index=pd.Index(df['no_transaksi'].astype(str).to_numpy(), name='no_transaksi'))
+
+
+class Ledger:
+    def __init__(self, budget=0):
+        self.budget = budget
+        self.entries = _entries(None)
+        self.daily = pd.Series(dtype=float, index=pd.DatetimeIndex([]))  # usage per day
+        self.total = 0.0
+        self.last_diff = None
+        self._summary = self._summarize()
+        self._lock = threading.Lock()
+
+    def apply(self, df_id):
+        # Bring the ledger in line with the latest transaction snapshot
+        with self._lock:
+            current = _entries(df_id)
+            old = self.entries
+            added = current.index.difference(old.index)
+            removed = old.index.difference(current.index)
+            common = current.index.intersection(old.index)
+            before, after = old.loc[common], current.loc[common]
+            differs = (before['price'].to_numpy() != after['price'].to_numpy()) | ~(
+                (before['day'] == after['day']) | (before['day'].isnull() & after['day'].isnull())
+            ).to_numpy()
+            changed = common[differs]
+
+            # Reverse the old entries, book the new ones
+            outgoing = old.loc[removed.append(changed)]
+            incoming = current.loc[added.append(changed)]
+            self.total += float(incoming['price'].sum() - outgoing['price'].sum())
+            delta = incoming.groupby('day')['price'].sum().sub(outgoing.groupby('day')['price'].sum(), fill_value=0)
+            daily = self.daily.add(delta, fill_value=0)
+            self.daily = daily[np.abs(daily.to_numpy()) > 1e-9].sort_index()
+
+            self.entries = current
+            self.last_diff = {'added': len(added), 'removed': len(removed), 'changed': len(changed)}
+            self._summary = self._summarize()
+            return self.last_diff
+
+    def set_budget(self, budget):
+        with self._lock:
+            self.budget = budget
+            self._summary = self._summarize()
+
+    def _summarize(self, now=None):
+        today = pd.Timestamp((now or datetime.now()).date())
+        window_start = today - timedelta(days=BURN_WINDOW_DAYS - 1)
+        recent = float(self.daily[(self.daily.index >= window_start) & (self.daily.index <= today)].sum())
+        daily_rate = recent / BURN_WINDOW_DAYS
+        remaining = self.budget - self.total
+        if remaining <= 0:
+            run_out = today
+        elif daily_rate > 0:
+            run_out = today + timedelta(days=float(np.ceil(remaining / daily_rate)))
+        else:
+            run_out = None
+        return {
+            'transactions': len(self.entries),
+            'budget': self.budget,
+            'usage': self.total,
+            'remaining': remaining,
+            'burn_rate': {period: daily_rate * days for period, days in PERIOD_DAYS.items()},
+            'burn_window_days': BURN_WINDOW_DAYS,
+            'run_out_date': run_out,
+            'computed_at': now or datetime.now(),
+        }
+
+    def summary(self):
+        # Precomputed at the last sync
+        return self._summary
@@ -0,0 +1,91 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+
+# Size-bounded LRU cache for derived results (row selections, tables, figures),
+# shared by all sessions. Keys should include the data snapshot version so a
+# refresh naturally stops hitting old entries, which then age out.
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+
+def estimate_size(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=False).sum()) if isinstance(value, pd.DataFrame) else int(value.memory_usage())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if callable(getattr(value, 'nbytes', None)):
+        # Rollup and TimeSeries report the arrays they hold
+        return value.nbytes()
+    if hasattr(value, 'data') and hasattr(value, 'to_plotly_json'):
+        # Plotly figures: the arrays and values of their traces
+        return sum(estimate_size(trace.to_plotly_json()) for trace in value.data)
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(estimate_size(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+def filter_key(name=None, date_range=None, wilayah=None, categories=None, voucher=None):
+    # Equivalent filter states map to the same key. The name search is used as
+    # given: callers normalize it once and pass the same value to the filter engine
+    return (
+        name or '',
+        tuple(str(value) for value in date_range) if date_range else None,
+        tuple(sorted(wilayah or [])),
+        tuple(sorted(categories or [])),
+        voucher or "All",
+    )
+
+
+class LRUCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                instrumentation.cache_result('memo', hit=True)
+                return self._entries[key][0]
+            self.misses += 1
+        instrumentation.cache_result('memo', hit=False)
+        # Computed outside the lock; concurrent misses on the same key just compute twice
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+import streamlit as st
+
+# Voucher programmes served by this deployment, one per corporate partner.
+# Each programme gets its own data partition: query_id.sql rows for its
+# voucher codes, its own Sheets roster and creds, caches, refresh schedule and
+# budget. Configure them in the secrets:
+#
+#   [programmes.bpjs]
+#   name = "Kognisi x BPJS"
+#   vouchers = ["KOGNISIXBPJSTK", "KOGNISIXBPJSKACAB", "KOGNISIXBPJSTK155"]
+#   voucher_options = ["KOGNISIXBPJSTK", "KOGNISIXBPJSKACAB"]  # sidebar filter, defaults to vouchers
+#   budget = 94572100
+#   refresh_interval = 900  # seconds
+#   spreadsheet = "Kognisi x BPJS"
+#
+# Without a [programmes] section the deployment serves the BPJS programme below.
+Programme = namedtuple("Programme", [
+    "key", "name", "vouchers", "voucher_options", "budget", "refresh_interval", "spreadsheet",
+    "roster_worksheet", "creds_worksheet",
+])
+
+DEFAULT_PROGRAMME = Programme(
+    key="bpjs",
+    name="Kognisi x BPJS",
+    vouchers=("KOGNISIXBPJSTK", "KOGNISIXBPJSKACAB", "KOGNISIXBPJSTK155"),
+    voucher_options=("KOGNISIXBPJSTK", "KOGNISIXBPJSKACAB"),
+    budget=94572100,
+    refresh_interval=900,
+    spreadsheet="Kognisi x BPJS",
+    roster_worksheet=None,  # first sheet
+    creds_worksheet="creds",
+)
+
+
+def programme_from_config(key, config):
+    vouchers = tuple(config.get("vouchers", ()))
+    if not vouchers:
+        # query_id.sql filters on v.code IN %(vouchers)s, which is invalid SQL for an empty list
+        raise ValueError(f"Programme {key!r} has no vouchers configured")
+    return Programme(
+        key=key,
+        name=config.get("name", key),
+        vouchers=vouchers,
+        voucher_options=tuple(config.get("voucher_options", vouchers)),
+        budget=config.get("budget", 0),
+        refresh_interval=config.get("refresh_interval", DEFAULT_PROGRAMME.refresh_interval),
+        spreadsheet=config.get("spreadsheet", DEFAULT_PROGRAMME.spreadsheet),
+        roster_worksheet=config.get("roster_worksheet"),
+        creds_worksheet=config.get("creds_worksheet", DEFAULT_PROGRAMME.creds_worksheet),
+    )
+
+
+@st.cache_resource
+def get_programmes():
+    try:
+        configured = st.secrets.get("programmes", {})
+    except FileNotFoundError:
+        configured = {}
+    if not configured:
+        return {DEFAULT_PROGRAMME.key: DEFAULT_PROGRAMME}
+    return {key: programme_from_config(key, config) for key, config in configured.items()}
+
+
+def get_programme(key=None):
+    # The first configured programme is the default
+    programmes = get_programmes()
+    return programmes[key] if key else next(iter(programmes.values()))
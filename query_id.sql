@@ -1,68 +1,174 @@
-SELECT 
+-- The transactions of this sync are picked by the filter on `t` below, and the
+-- per-(user, course) aggregates are computed only for the (user, course) pairs
+-- those transactions cover, so an incremental sync doesn't aggregate the whole
+-- progress/contents/quiz tables. Only derived tables are used, no WITH, so the
+-- query runs on MySQL 5.7 as well as 8.0; each aggregate therefore repeats the
+-- transaction filter to pick its pairs.
+SELECT
     t.serial as no_transaksi,
-    t.created_at AS enroll_date, 
+    t.created_at AS enroll_date,
     u.full_name as nama,
     u.phone_number as phone_number,
     u.email as email,
     c.title as title,
     cat.name AS category_name,
-    v.code as voucher, 
+    t.code as voucher,
     c.price_normal as price,
-    MIN(cup.created_at) AS created_at, 
-    MAX(cup.updated_at) AS updated_at,
-    ROUND(AVG(cup.progress_percentage),1) AS progress,
-    ROUND(SUM(cup.progress_duration),1) as duration,
+    p.created_at,
+    p.updated_at,
+    p.progress,
+    p.duration,
     cq.total_correct_answers,
     CASE WHEN
 	    cu.is_accomplished = 1 THEN 'Finished'
 	    ELSE 'In Progress' END AS 'status',
-	MAX(CASE WHEN LOWER (cc.title) LIKE '%pre%' THEN cup.score END) AS 'pre_test',
-    MAX(CASE WHEN LOWER (cc.title) LIKE '%post%' THEN cup.score END) AS 'post_test'
-FROM 
-    transactions t
-LEFT JOIN 
-    users u ON t.user_serial = u.serial 
-LEFT JOIN 
-    courses c ON t.course_serial = c.serial 
-LEFT JOIN 
-    vouchers v ON t.voucher_serial = v.serial 
-LEFT JOIN 
-    voucher_claims vc ON vc.user_serial = u.serial AND vc.voucher_serial = v.serial 
-LEFT JOIN 
-    categories cat ON c.category_serial = cat.serial 
-LEFT JOIN 
-    course_users cu ON t.course_serial = cu.course_serial AND t.user_serial = cu.user_serial 
-LEFT JOIN 
-    course_user_progress cup ON cu.course_serial = cup.course_serial AND cu.user_serial = cup.user_serial 
-LEFT JOIN 
-    course_sections cs ON c.serial = cs.course_serial 
-LEFT JOIN 
-    course_contents cc ON c.serial = cc.course_serial 
-LEFT JOIN 
+    CASE WHEN ct.has_pre_test = 1 THEN p.max_score END AS 'pre_test',
+    CASE WHEN ct.has_post_test = 1 THEN p.max_score END AS 'post_test'
+FROM
     (
-        SELECT 
-            cuqa.user_serial, 
-            cuqa.course_serial, 
+        SELECT
+            t.serial,
+            t.created_at,
+            t.user_serial,
+            t.course_serial,
+            v.code
+        FROM
+            transactions t
+        JOIN
+            vouchers v ON t.voucher_serial = v.serial
+        WHERE
+            t.status = 'SUCCEEDED'
+            AND t.invoice_id IS NOT NULL
+            -- Voucher codes of the programme being synced
+            AND v.code IN %(vouchers)s
+            -- Incremental sync: only transactions created, or whose progress changed, since the watermark
+            AND (
+                t.created_at >= %(since)s
+                OR EXISTS (
+                    SELECT 1
+                    FROM course_user_progress cupw
+                    WHERE cupw.user_serial = t.user_serial
+                        AND cupw.course_serial = t.course_serial
+                        AND (cupw.created_at >= %(since)s OR cupw.updated_at >= %(since)s)
+                )
+            )
+    ) t
+LEFT JOIN
+    users u ON t.user_serial = u.serial
+LEFT JOIN
+    courses c ON t.course_serial = c.serial
+LEFT JOIN
+    categories cat ON c.category_serial = cat.serial
+LEFT JOIN
+    course_users cu ON t.course_serial = cu.course_serial AND t.user_serial = cu.user_serial
+-- Progress is aggregated per (user, course) before joining, so section/content
+-- rows no longer multiply it (SUM(progress_duration) used to be inflated)
+LEFT JOIN
+    (
+        SELECT
+            cup.user_serial,
+            cup.course_serial,
+            MIN(cup.created_at) AS created_at,
+            MAX(cup.updated_at) AS updated_at,
+            ROUND(AVG(cup.progress_percentage),1) AS progress,
+            ROUND(SUM(cup.progress_duration),1) AS duration,
+            MAX(cup.score) AS max_score
+        FROM
+            (
+                SELECT DISTINCT t.user_serial, t.course_serial
+                FROM
+                    transactions t
+                JOIN
+                    vouchers v ON t.voucher_serial = v.serial
+                WHERE
+                    t.status = 'SUCCEEDED'
+                    AND t.invoice_id IS NOT NULL
+                    AND v.code IN %(vouchers)s
+                    AND (
+                        t.created_at >= %(since)s
+                        OR EXISTS (
+                            SELECT 1
+                            FROM course_user_progress cupw
+                            WHERE cupw.user_serial = t.user_serial
+                                AND cupw.course_serial = t.course_serial
+                                AND (cupw.created_at >= %(since)s OR cupw.updated_at >= %(since)s)
+                        )
+                    )
+            ) pairs
+        JOIN
+            course_user_progress cup
+            ON cup.user_serial = pairs.user_serial AND cup.course_serial = pairs.course_serial
+        GROUP BY
+            cup.user_serial, cup.course_serial
+    ) p
+    ON cu.user_serial = p.user_serial AND cu.course_serial = p.course_serial
+-- Whether a course has pre/post test contents, one row per course
+LEFT JOIN
+    (
+        SELECT
+            cc.course_serial,
+            MAX(LOWER(cc.title) LIKE '%%pre%%') AS has_pre_test,
+            MAX(LOWER(cc.title) LIKE '%%post%%') AS has_post_test
+        FROM
+            course_contents cc
+        WHERE
+            cc.course_serial IN (
+                SELECT DISTINCT t.course_serial
+                FROM
+                    transactions t
+                JOIN
+                    vouchers v ON t.voucher_serial = v.serial
+                WHERE
+                    t.status = 'SUCCEEDED'
+                    AND t.invoice_id IS NOT NULL
+                    AND v.code IN %(vouchers)s
+                    AND (
+                        t.created_at >= %(since)s
+                        OR EXISTS (
+                            SELECT 1
+                            FROM course_user_progress cupw
+                            WHERE cupw.user_serial = t.user_serial
+                                AND cupw.course_serial = t.course_serial
+                                AND (cupw.created_at >= %(since)s OR cupw.updated_at >= %(since)s)
+                        )
+                    )
+            )
+        GROUP BY
+            cc.course_serial
+    ) ct
+    ON c.serial = ct.course_serial
+LEFT JOIN
+    (
+        SELECT
+            cuqa.user_serial,
+            cuqa.course_serial,
             SUM(cuqa.is_correct) AS total_correct_answers
-        FROM 
+        FROM
+            (
+                SELECT DISTINCT t.user_serial, t.course_serial
+                FROM
+                    transactions t
+                JOIN
+                    vouchers v ON t.voucher_serial = v.serial
+                WHERE
+                    t.status = 'SUCCEEDED'
+                    AND t.invoice_id IS NOT NULL
+                    AND v.code IN %(vouchers)s
+                    AND (
+                        t.created_at >= %(since)s
+                        OR EXISTS (
+                            SELECT 1
+                            FROM course_user_progress cupw
+                            WHERE cupw.user_serial = t.user_serial
+                                AND cupw.course_serial = t.course_serial
+                                AND (cupw.created_at >= %(since)s OR cupw.updated_at >= %(since)s)
+                        )
+                    )
+            ) pairs
+        JOIN
             course_user_quiz_answers cuqa
-        GROUP BY 
+            ON cuqa.user_serial = pairs.user_serial AND cuqa.course_serial = pairs.course_serial
+        GROUP BY
             cuqa.user_serial, cuqa.course_serial
-    ) cq 
-    ON u.serial = cq.user_serial AND c.serial = cq.course_serial
-WHERE 
-    t.status = 'SUCCEEDED'
-    AND t.invoice_id IS NOT NULL
-    AND v.code IN ('KOGNISIXBPJSTK', 'KOGNISIXBPJSKACAB', 'KOGNISIXBPJSTK155')
-GROUP BY 
-    t.serial,
-    t.created_at, 
-    u.full_name,
-    u.phone_number,
-    u.email, 
-    c.title,
-    cat.name,
-    v.code, 
-    c.price_normal,
-    cq.total_correct_answers,
-    cu.is_accomplished;
+    ) cq
+    ON u.serial = cq.user_serial AND c.serial = cq.course_serial;
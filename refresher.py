@@ -0,0 +1,69 @@
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+# Stale-while-revalidate refresher: a worker thread rebuilds a dataset on a
+# schedule and swaps the finished result in, so readers never wait on a fetch.
+Snapshot = namedtuple("Snapshot", ["version", "data", "built_at"])
+
+logger = logging.getLogger(__name__)
+
+
+class Refresher:
+    def __init__(self, build, interval, name="refresher"):
+        self.build = build
+        self.interval = interval
+        self.name = name
+        self.last_error = None
+        self._snapshot = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self.refresh_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def refresh_once(self):
+        try:
+            data = self.build()
+        except Exception as e:
+            # Keep serving the previous snapshot
+            self.last_error = e
+            logger.exception("%s: rebuild failed", self.name)
+            self._ready.set()
+            return None
+        with self._lock:
+            self._version += 1
+            self._snapshot = Snapshot(self._version, data, datetime.now())
+        self.last_error = None
+        self._ready.set()
+        return self._snapshot
+
+    def trigger(self):
+        # Ask the worker to rebuild now instead of at the next interval
+        self._wake.set()
+
+    def current(self):
+        with self._lock:
+            return self._snapshot
+
+    def wait_ready(self, timeout=None):
+        # Returns once the first rebuild has finished, successfully or not
+        self._ready.wait(timeout)
+        return self.current()
+
+    def age(self):
+        snapshot = self.current()
+        return datetime.now() - snapshot.built_at if snapshot else None
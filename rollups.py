@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+
+# Pre-aggregated cube of df_combined at (day, wilayah, category, voucher, title)
+# grain. Distinct users per cell are kept as sorted integer user codes in one
+# flat array per set (with the owning cell of each member), so distinct counts
+# over any filter are a gather plus a unique instead of a rescan of the rows.
+# Each (cell, user) pair of the 'users' set also carries that user's title and
+# completed row counts in the cell, which is what the top-user table sums.
+DIMENSIONS = ['day', 'wilayah', 'category_name', 'voucher', 'title']
+MEASURES = ['rows', 'price', 'price_count', 'progress_sum', 'progress_count', 'duration', 'vouchers']
+USER_SETS = ['users', 'enrolled', 'completed']
+USER_ROW_COUNTS = ['titles', 'completed']
+
+
+def _column(df, col):
+    return df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+
+
+def _members(group_ids, user_codes, n_users, return_inverse=False):
+    # Distinct (cell, user) pairs sorted by cell, as parallel arrays
+    valid = user_codes >= 0
+    pairs, inverse = np.unique(group_ids[valid].astype(np.int64) * n_users + user_codes[valid], return_inverse=True)
+    cells, users = np.divmod(pairs, max(n_users, 1))
+    members = cells.astype(np.int32), users.astype(np.int32)
+    if return_inverse:
+        return members, valid, inverse.reshape(-1)
+    return members
+
+
+def _empty_members():
+    return np.array([], dtype=np.int32), np.array([], dtype=np.int32)
+
+
+def build_rollup(df, by_day=True):
+    # by_day=False leaves out the day grain (the cube's day is null, so select()
+    # keeps every cell for any date range), for rows that are already date-filtered
+    n = len(df)
+    if by_day:
+        day = pd.to_datetime(_column(df, 'enroll_date'), errors='coerce').dt.normalize()
+    else:
+        day = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    dims = {
+        'day': day,
+        'wilayah': _column(df, 'wilayah'),
+        'category_name': _column(df, 'category_name'),
+        'voucher': _column(df, 'voucher'),
+        'title': _column(df, 'title'),
+    }
+    if n == 0:
+        return Rollup(
+            pd.DataFrame(columns=DIMENSIONS + MEASURES),
+            {name: _empty_members() for name in USER_SETS},
+            user_rows={name: np.array([], dtype=np.int32) for name in USER_ROW_COUNTS},
+        )
+
+    # One group id per distinct dimension tuple, from a single packed integer key;
+    # nulls are their own group
+    key = np.zeros(n, dtype=np.int64)
+    uniques = []
+    for values in dims.values():
+        dim_codes, dim_uniques = pd.factorize(values, use_na_sentinel=False)
+        key = key * len(dim_uniques) + dim_codes
+        uniques.append(dim_uniques)
+    group_keys, group_ids = np.unique(key, return_inverse=True)
+    group_ids = group_ids.reshape(-1)
+    n_groups = len(group_keys)
+
+    columns = {}
+    for name, dim_uniques in zip(reversed(DIMENSIONS), reversed(uniques)):
+        group_keys, dim_codes = np.divmod(group_keys, len(dim_uniques))
+        columns[name] = pd.Series(np.asarray(dim_uniques)[dim_codes])
+    cube = pd.DataFrame({name: columns[name] for name in DIMENSIONS})
+
+    # Additive measures
+    def total(values):
+        return np.bincount(group_ids, weights=values, minlength=n_groups)
+
+    price = pd.to_numeric(_column(df, 'price'), errors='coerce').to_numpy(dtype=float)
+    progress = pd.to_numeric(_column(df, 'progress'), errors='coerce').to_numpy(dtype=float)
+    duration = pd.to_numeric(_column(df, 'duration'), errors='coerce').to_numpy(dtype=float)
+    cube['rows'] = np.bincount(group_ids, minlength=n_groups)
+    cube['price'] = total(np.nan_to_num(price))
+    cube['price_count'] = total(~np.isnan(price))
+    cube['progress_sum'] = total(np.nan_to_num(progress))
+    cube['progress_count'] = total(~np.isnan(progress))
+    cube['duration'] = total(np.nan_to_num(duration))
+    cube['vouchers'] = total(_column(df, 'voucher').notnull().to_numpy())
+
+    # Distinct-user sets
+    user_codes, emails = pd.factorize(_column(df, 'email'))
+    members = {}
+    enrolled = _column(df, 'no_transaksi').notnull().to_numpy()
+    completed = progress == 100
+    members['users'], valid, pair_ids = _members(group_ids, user_codes, len(emails), return_inverse=True)
+    for name, mask in (('enrolled', enrolled), ('completed', completed)):
+        members[name] = _members(group_ids, np.where(mask, user_codes, -1), len(emails))
+
+    # Row counts per (cell, user) pair, aligned with members['users']
+    n_pairs = len(members['users'][0])
+    user_rows = {
+        'titles': np.bincount(pair_ids, weights=_column(df, 'title').notnull().to_numpy()[valid], minlength=n_pairs),
+        'completed': np.bincount(pair_ids, weights=completed[valid], minlength=n_pairs),
+    }
+    user_rows = {name: counts.astype(np.int32) for name, counts in user_rows.items()}
+    # Display name per user code
+    names = pd.Series(np.asarray(_column(df, 'nama'), dtype=object)).groupby(user_codes).first()
+    user_names = names.reindex(np.arange(len(emails))).to_numpy(dtype=object)
+
+    return Rollup(cube, members, emails, user_rows, user_names)
+
+
+class Rollup:
+    def __init__(self, cube, members, emails=None, user_rows=None, user_names=None):
+        self.cube = cube
+        self.members = members
+        self.n_users = len(emails) if emails is not None else 0
+        self.user_rows = user_rows or {}
+        self.user_names = user_names if user_names is not None else np.array([], dtype=object)
+        self._factorized = {}
+
+    def nbytes(self):
+        # Memory held by the cube and the member arrays, for the memo's byte bound
+        arrays = [array for pair in self.members.values() for array in pair]
+        arrays += list(self.user_rows.values()) + [self.user_names]
+        arrays += [codes for codes, _ in self._factorized.values()]
+        return int(self.cube.memory_usage(deep=False).sum()) + sum(array.nbytes for array in arrays)
+
+    def factorize(self, dim):
+        # Codes of a cube dimension (nulls are -1); the cube never changes, so this runs once per dim
+        if dim not in self._factorized:
+            self._factorized[dim] = pd.factorize(self.cube[dim])
+        return self._factorized[dim]
+
+    def select(self, date_range=None, wilayah=None, categories=None, voucher=None):
+        # Boolean mask over cube cells, mirroring the sidebar filters
+        cube = self.cube
+        mask = np.ones(len(cube), dtype=bool)
+        if date_range:
+            start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
+            day = pd.to_datetime(cube['day'])
+            # Rows without an enroll date are always kept
+            mask &= (day.isnull() | ((day >= start) & (day <= end))).to_numpy()
+        if wilayah:
+            mask &= cube['wilayah'].isin(wilayah).to_numpy()
+        if categories:
+            mask &= cube['category_name'].isin(categories).to_numpy()
+        if voucher and voucher != "All":
+            mask &= (cube['voucher'] == voucher).to_numpy()
+        return mask
+
+    def selected_members(self, mask):
+        # Members of every user set that fall in the selected cells, gathered once
+        # and shared by kpis(), by() and top_users()
+        selected = {}
+        for name in USER_SETS:
+            cells, users = self.members[name]
+            keep = mask[cells] if len(cells) else np.zeros(0, dtype=bool)
+            selected[name] = (cells[keep], users[keep], keep)
+        return selected
+
+    def kpis(self, mask, selected=None):
+        selected = selected or self.selected_members(mask)
+        cells = self.cube[mask]
+        progress_count = cells['progress_count'].sum()
+        return {
+            'users': len(np.unique(selected['users'][1])),
+            'enrolled': len(np.unique(selected['enrolled'][1])),
+            'completed': len(np.unique(selected['completed'][1])),
+            'price': cells['price'].sum(),
+            'avg_progress': cells['progress_sum'].sum() / progress_count if progress_count else np.nan,
+            'duration': cells['duration'].sum(),
+            'vouchers': int(cells['vouchers'].sum()),
+        }
+
+    def distinct_count(self, mask, name):
+        cells, users = self.members[name]
+        return len(np.unique(users[mask[cells]]))
+
+    def by(self, mask, dim, selected=None):
+        # Per-value distinct users, enrollments and completions plus price totals
+        selected_members = selected or self.selected_members(mask)
+        dim_codes, values = self.factorize(dim)
+        dim_codes = np.where(mask, dim_codes, -1)
+        n_values = len(values)
+        table = pd.DataFrame(index=pd.Index(values, name=dim))
+        for name in USER_SETS:
+            # Distinct (value, user) pairs, counted per value; null values drop out
+            cells, users, _ = selected_members[name]
+            keys = dim_codes[cells].astype(np.int64)
+            keep = keys >= 0
+            pairs = np.unique(keys[keep] * max(self.n_users, 1) + users[keep])
+            table[name] = np.bincount(pairs // max(self.n_users, 1), minlength=n_values)
+        selected = dim_codes >= 0
+        table['price'] = np.bincount(
+            dim_codes[selected], weights=self.cube['price'].to_numpy(dtype=float)[selected], minlength=n_values
+        )
+        price_count = np.bincount(
+            dim_codes[selected], weights=self.cube['price_count'].to_numpy(dtype=float)[selected], minlength=n_values
+        )
+        table['avg_price'] = table['price'] / np.where(price_count > 0, price_count, np.nan)
+        # Only values present in the selection, in value order, like a groupby over the filtered rows
+        return table[np.bincount(dim_codes[selected], minlength=n_values) > 0].sort_index()
+
+    def top_users(self, mask, n=10, selected=None):
+        # Title and completed row counts per (user, wilayah), highest completions first
+        selected = selected or self.selected_members(mask)
+        cells, users, keep = selected['users']
+        wilayah_codes, wilayah = self.factorize('wilayah')
+        wilayah_codes = wilayah_codes[cells]
+        has_key = (wilayah_codes >= 0) & pd.notnull(self.user_names[users])
+        # One integer key per (user, wilayah), summed with bincount
+        n_wilayah = max(len(wilayah), 1)
+        keys, inverse = np.unique(users[has_key].astype(np.int64) * n_wilayah + wilayah_codes[has_key], return_inverse=True)
+        inverse = inverse.reshape(-1)
+        table = pd.DataFrame({
+            'user': keys // n_wilayah,
+            'wilayah_code': keys % n_wilayah,
+            'title_count': np.bincount(inverse, weights=self.user_rows['titles'][keep][has_key], minlength=len(keys)).astype(int),
+            'progress_100%': np.bincount(inverse, weights=self.user_rows['completed'][keep][has_key], minlength=len(keys)).astype(int),
+        })
+        table = table.sort_values(by='progress_100%', ascending=False, kind='stable').head(n)
+        table.insert(0, 'nama', self.user_names[table['user'].to_numpy()])
+        table.insert(1, 'wilayah', np.asarray(wilayah, dtype=object)[table['wilayah_code'].to_numpy()])
+        table.index = range(1, len(table) + 1)
+        return table[['nama', 'wilayah', 'title_count', 'progress_100%']]
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+# Compact canonical representation of df_combined. Repeated strings become
+# categoricals (emails included, so their category codes double as integer
+# user keys), the _id/_bpjs duplicates left by the email join are coalesced
+# and scores are downcast. Money and durations stay float64 so sums don't drift.
+CATEGORY_COLUMNS = [
+    'email', 'nama', 'phone_number', 'title', 'category_name', 'voucher', 'status', 'wilayah', 'unit_kerja',
+]
+FLOAT32_COLUMNS = ['progress', 'total_correct_answers', 'pre_test', 'post_test']
+# Other text columns become categorical when at most this share of values is distinct
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+
+def coalesce_suffixes(df, suffixes=('_id', '_bpjs')):
+    # Columns present in both sources: prefer the transaction value, fall back to the sheet
+    left, right = suffixes
+    for col in [col for col in df.columns if col.endswith(left)]:
+        base = col[:-len(left)]
+        other = base + right
+        if other in df.columns and base not in df.columns:
+            df[base] = df[col].combine_first(df[other])
+            df = df.drop(columns=[col, other])
+    return df
+
+
+def _should_categorize(series):
+    if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype != object:
+        return False
+    non_null = series.count()
+    return non_null > 0 and series.nunique() <= non_null * CATEGORY_MAX_UNIQUE_RATIO
+
+
+def compact(df):
+    # Columns are replaced on a shallow copy, so the caller's frame is left as it was
+    df = coalesce_suffixes(df.copy(deep=False))
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Categories must be strings or numbers, not a mix
+            values = df[col]
+            if values.dropna().map(type).nunique() > 1:
+                values = values.where(values.isnull(), values.astype(str))
+            df[col] = values.astype('category')
+        elif col in FLOAT32_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float32)
+        elif _should_categorize(df[col]):
+            df[col] = df[col].astype('category')
+    return df
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Server-side paginated table. Search and sort run here against row positions
+# of the in-memory frame, and only the visible page is taken from it and sent to
+# the browser. rows() gives the positions in the frame to show (all of them if
+# it is None) and is only called while the table is switched on.
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def search_rows(df, text, columns=None, rows=None):
+    # Case-insensitive literal match in any of the text columns, among rows (positions)
+    text = text.strip().lower()
+    rows = np.arange(len(df)) if rows is None else np.asarray(rows)
+    mask = np.zeros(len(rows), dtype=bool)
+    for col in columns or df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Match each category once, then map through the codes
+            hits = values.cat.categories.astype(str).str.lower().str.contains(text, regex=False)
+            mask |= np.isin(values.cat.codes.to_numpy()[rows], np.flatnonzero(hits))
+        elif values.dtype == object:
+            values = values.take(rows)
+            mask |= values.astype(str).str.lower().str.contains(text, regex=False).to_numpy() & values.notnull().to_numpy()
+    return rows[mask]
+
+
+def order_rows(df, search=None, sort_by=None, ascending=True, search_columns=None, rows=None):
+    # Row positions after search and sort
+    positions = np.arange(len(df)) if rows is None else np.asarray(rows)
+    if search:
+        positions = search_rows(df, search, search_columns, positions)
+    if sort_by:
+        values = df[sort_by].take(positions).reset_index(drop=True)
+        order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        positions = positions[order]
+    return positions
+
+
+def paginated_table(label, df, key, rows=None, cached=None, columns=None, search_columns=None, page_size=PAGE_SIZES[1]):
+    # cached(view, compute) memoizes derived results, e.g. the app's cross-session memo
+    if not st.toggle(label, key=f"{key}_open"):
+        return
+    cached = cached or (lambda view, compute: compute())
+    rows = cached((key, 'rows'), rows) if rows is not None else None
+    columns = list(columns or df.columns)
+
+    search_col, sort_col, order_col, size_col = st.columns([3, 2, 1, 1])
+    with search_col:
+        search = st.text_input("Search", key=f"{key}_search")
+    with sort_col:
+        sort_by = st.selectbox("Sort by", options=[None] + columns, key=f"{key}_sort",
+                               format_func=lambda col: "(none)" if col is None else col)
+    with order_col:
+        ascending = st.radio("Order", options=[True, False], key=f"{key}_ascending",
+                             format_func=lambda value: "Asc" if value else "Desc")
+    with size_col:
+        size = st.selectbox("Rows", options=PAGE_SIZES, index=PAGE_SIZES.index(page_size), key=f"{key}_size")
+
+    positions = cached((key, 'order', search.strip().lower(), sort_by, ascending),
+                       lambda: order_rows(df, search, sort_by, ascending, search_columns or columns, rows))
+    pages = max(1, -(-len(positions) // size))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    page = min(page, pages)
+
+    start = (page - 1) * size
+    st.dataframe(df.take(positions[start:start + size])[columns])
+    st.caption(f"Rows {min(start + 1, len(positions)):,}-{min(start + size, len(positions)):,} of {len(positions):,}")
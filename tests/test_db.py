@@ -0,0 +1,155 @@
+import os
+
+import pymysql
+import pytest
+
+import db
+from db import ConnectionManager
+
+DB_CONFIG = {'host': 'localhost', 'port': 3306, 'user': 'test', 'password': 'test', 'database': 'test'}
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self.rows = []
+
+    def execute(self, sql, args=None):
+        if self.conn.fail_on_execute:
+            raise pymysql.OperationalError(2013, "Lost connection to MySQL server during query")
+        self.description = [('a',), ('b',)]
+        self.rows = list(self.conn.rows)
+
+    def fetchmany(self, size):
+        if self.conn.fail_on_fetch and self.conn.fetches:
+            raise pymysql.OperationalError(2013, "Lost connection to MySQL server during query")
+        self.conn.fetches += 1
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeConnection:
+    def __init__(self, rows, fail_on_execute=False, fail_on_fetch=False):
+        self.rows = rows
+        self.fail_on_execute = fail_on_execute
+        self.fail_on_fetch = fail_on_fetch
+        self.fetches = 0
+        self.closed = False
+
+    def cursor(self, cursorclass=None):
+        return FakeCursor(self)
+
+    def ping(self, reconnect=False):
+        if self.closed:
+            raise pymysql.InterfaceError(0, "closed")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    # pymysql.connect hands out the queued fake connections in order
+    queued, opened = [], []
+
+    def connect(**kwargs):
+        conn = queued.pop(0)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(db.pymysql, 'connect', connect)
+    return queued, opened
+
+
+def test_stream_retries_once_when_the_connection_died(connections):
+    queued, opened = connections
+    queued += [FakeConnection([], fail_on_execute=True), FakeConnection([(1, 2), (3, 4)])]
+    manager = ConnectionManager(DB_CONFIG)
+
+    batches = list(manager.stream("SELECT a, b FROM t", batch_size=1))
+
+    assert batches == [(['a', 'b'], [(1, 2)]), (['a', 'b'], [(3, 4)])]
+    assert opened[0].closed
+    # The healthy connection went back to the pool
+    assert not opened[1].closed and manager._pool.qsize() == 1
+
+
+def test_stream_does_not_retry_after_the_first_batch(connections):
+    queued, opened = connections
+    queued += [FakeConnection([(1, 2), (3, 4)], fail_on_fetch=True), FakeConnection([])]
+    manager = ConnectionManager(DB_CONFIG)
+
+    stream = manager.stream("SELECT a, b FROM t", batch_size=1)
+    assert next(stream) == (['a', 'b'], [(1, 2)])
+    with pytest.raises(pymysql.OperationalError):
+        next(stream)
+    assert len(opened) == 1 and opened[0].closed
+    assert manager._pool.qsize() == 0
+
+
+def test_stream_stopped_early_closes_the_connection(connections):
+    queued, opened = connections
+    queued += [FakeConnection([(1, 2), (3, 4), (5, 6)]), FakeConnection([(7, 8)])]
+    manager = ConnectionManager(DB_CONFIG)
+
+    stream = manager.stream("SELECT a, b FROM t", batch_size=1)
+    next(stream)
+    stream.close()
+
+    # Unread rows are left on the wire, so the connection is dropped rather than pooled
+    assert opened[0].closed and manager._pool.qsize() == 0
+    assert manager.query("SELECT a, b FROM t") == [(7, 8)]
+
+
+def test_read_frame_of_an_empty_result_keeps_the_columns(connections):
+    queued, _ = connections
+    queued.append(FakeConnection([]))
+    df = ConnectionManager(DB_CONFIG).read_frame("SELECT a, b FROM t")
+    assert list(df.columns) == ['a', 'b'] and df.empty
+
+
+# Against a local MySQL with the tunnel off (use_tunnel = false), e.g.
+#   KOGNISI_TEST_MYSQL=root:secret@127.0.0.1:3306/test python -m pytest tests
+LOCAL_MYSQL = os.environ.get('KOGNISI_TEST_MYSQL')
+
+
+def _local_config():
+    credentials, _, location = LOCAL_MYSQL.rpartition('@')
+    user, _, password = credentials.partition(':')
+    address, _, database = location.partition('/')
+    host, _, port = address.partition(':')
+    return {'host': host, 'port': int(port or 3306), 'user': user, 'password': password, 'database': database}
+
+
+@pytest.mark.skipif(not LOCAL_MYSQL, reason="KOGNISI_TEST_MYSQL is not set")
+def test_local_mysql_without_tunnel():
+    manager = ConnectionManager(_local_config(), ssh_config=None, pool_size=1)
+    try:
+        df = manager.read_frame(
+            "SELECT 1 AS n, 'a' AS s UNION ALL SELECT 2, 'b'", dtypes={'n': 'int', 's': 'category'}, batch_size=1,
+        )
+        assert df['n'].tolist() == [1, 2] and df['s'].tolist() == ['a', 'b']
+        # Stopping a stream early must not leave the pool with a connection mid-result
+        stream = manager.stream("SELECT 1 UNION ALL SELECT 2", batch_size=1)
+        next(stream)
+        stream.close()
+        assert manager.query("SELECT 3 AS n") == [{'n': 3}]
+    finally:
+        manager.close()
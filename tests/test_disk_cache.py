@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+import pytest
+
+import disk_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache, 'CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_move_snapshot_into_a_partition_under_the_old_name(cache_dir):
+    # The old top-level "bpjs" roster snapshot moves to "bpjs/bpjs"
+    roster = pd.DataFrame({'email': ['a@x.id', 'b@x.id']})
+    disk_cache.save_snapshot('bpjs', roster, {'modified_time': 't0'})
+    disk_cache.save_snapshot('data_id', pd.DataFrame({'no_transaksi': ['1']}))
+
+    assert disk_cache.move_snapshot('bpjs', 'bpjs/bpjs')
+    assert disk_cache.move_snapshot('data_id', 'bpjs/data_id')
+
+    df, info = disk_cache.load_snapshot('bpjs/bpjs')
+    pd.testing.assert_frame_equal(df, roster)
+    assert info['meta'] == {'modified_time': 't0'}
+    assert disk_cache.load_snapshot('bpjs/data_id')[0]['no_transaksi'].tolist() == ['1']
+    assert sorted(os.listdir(cache_dir / 'bpjs')) == ['bpjs', 'data_id']
+    assert not (cache_dir / 'data_id').exists()
+
+
+def test_move_snapshot_keeps_an_existing_target(cache_dir):
+    disk_cache.save_snapshot('creds', pd.DataFrame({'username': ['old']}))
+    disk_cache.save_snapshot('bpjs/creds', pd.DataFrame({'username': ['new']}))
+
+    assert not disk_cache.move_snapshot('creds', 'bpjs/creds')
+    assert not disk_cache.move_snapshot('missing', 'bpjs/missing')
+    assert disk_cache.load_snapshot('bpjs/creds')[0]['username'].tolist() == ['new']
@@ -0,0 +1,50 @@
+import pandas as pd
+
+from email_index import EmailIndex
+
+
+def outer_merge(df_id, df_bpjs):
+    sheet = df_bpjs.drop_duplicates(subset='email', keep='last')
+    return pd.merge(df_id, sheet, on='email', how='outer', suffixes=('_id', '_bpjs'))
+
+
+def sorted_rows(df):
+    return df.sort_values(['email', 'no_transaksi'], na_position='last').reset_index(drop=True)
+
+
+def test_join_matches_an_outer_merge():
+    df_id = pd.DataFrame({
+        'no_transaksi': ['t1', 't2', 't3', 't4', 't5'],
+        'email': ['a@x.id', 'b@x.id', 'a@x.id', 'gone@x.id', None],
+        'nama': ['A', 'B', 'A', 'G', 'N'],
+        'price': [10.0, 20.0, 30.0, 40.0, 50.0],
+        'voucher': pd.Categorical(['V1', 'V2', 'V1', 'V1', 'V2']),
+    }, index=[3, 5, 8, 13, 21])
+    df_bpjs = pd.DataFrame({
+        'email': ['a@x.id', 'b@x.id', 'idle@x.id', 'b@x.id'],
+        'nama': ['A sheet', 'B old', 'I', 'B sheet'],
+        'unit_kerja': ['U1', 'U2', 'U3', 'U2'],
+    })
+    index = EmailIndex()
+    index.update(df_bpjs)
+    combined = index.join(df_id)
+
+    expected = outer_merge(df_id, df_bpjs)
+    assert list(combined.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(sorted_rows(combined), sorted_rows(expected))
+    # Transactions keep their order, idle employees follow
+    assert combined['no_transaksi'].tolist()[:5] == df_id['no_transaksi'].tolist()
+    assert combined['email'].iloc[-1] == 'idle@x.id'
+    assert index.last_report['unmatched_transactions'] == 2
+    assert index.last_report['employees_without_transactions'] == 1
+
+
+def test_join_after_a_sheet_diff():
+    df_id = pd.DataFrame({'no_transaksi': ['t1', 't2'], 'email': ['a@x.id', 'c@x.id']})
+    index = EmailIndex()
+    index.update(pd.DataFrame({'email': ['a@x.id', 'b@x.id'], 'unit_kerja': ['U1', 'U2']}))
+    df_bpjs = pd.DataFrame({'email': ['a@x.id', 'c@x.id'], 'unit_kerja': ['U9', 'U3']})
+    assert index.update(df_bpjs) == {'added': 1, 'removed': 1, 'changed': 1, 'duplicate_emails': 0}
+
+    combined = index.join(df_id)
+    pd.testing.assert_frame_equal(sorted_rows(combined), sorted_rows(outer_merge(df_id, df_bpjs)))
@@ -0,0 +1,32 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from export import export_bytes
+
+
+def test_parquet_column_null_in_the_first_chunk_keeps_its_type():
+    df = pd.DataFrame({'a': range(6), 'voucher': [None, None, None, 'X', 'Y', None]})
+    table = pq.read_table(io.BytesIO(export_bytes(df, 'parquet', chunk_rows=3)))
+    assert table.schema.field('voucher').type == pa.string()
+    pd.testing.assert_frame_equal(table.to_pandas(), df)
+
+
+def test_parquet_selection_and_columns():
+    df = pd.DataFrame({
+        'a': range(6),
+        'when': pd.date_range('2024-01-01', periods=6),
+        'wilayah': pd.Categorical(['K1', 'K2'] * 3),
+        'voucher': [None] * 6,
+    })
+    data = export_bytes(df, 'parquet', rows=[5, 1, 3], columns=['a', 'when', 'voucher'], chunk_rows=2)
+    expected = df.take([5, 1, 3])[['a', 'when', 'voucher']].reset_index(drop=True)
+    pd.testing.assert_frame_equal(pq.read_table(io.BytesIO(data)).to_pandas(), expected)
+
+
+def test_parquet_empty_selection_writes_the_header():
+    df = pd.DataFrame({'a': range(3), 'voucher': ['X', None, 'Y']})
+    table = pq.read_table(io.BytesIO(export_bytes(df, 'parquet', rows=[])))
+    assert table.num_rows == 0 and table.schema.field('voucher').type == pa.string()
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from memo import LRUCache, estimate_size
+from rollups import build_rollup
+from timeseries import build_timeseries
+
+
+def frame(n):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'email': [f'u{i}@x.id' for i in rng.integers(0, n // 4, n)],
+        'nama': 'Nama',
+        'enroll_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, n), unit='D'),
+        'wilayah': rng.choice(['K1', 'K2', 'K3'], n),
+        'category_name': rng.choice(['C1', 'C2'], n),
+        'voucher': 'V1',
+        'title': [f'T{i}' for i in rng.integers(0, 50, n)],
+        'no_transaksi': np.arange(n).astype(str),
+        'price': 1000.0,
+        'progress': rng.choice([0.0, 50.0, 100.0], n),
+        'duration': 3600.0,
+    })
+
+
+def test_structures_are_sized_by_their_arrays():
+    df = frame(5000)
+    rollup, timeseries = build_rollup(df), build_timeseries(df)
+    users, _ = rollup.members['users']
+    assert estimate_size((rollup, np.ones(len(rollup.cube), dtype=bool))) > users.nbytes * 2
+    assert estimate_size(timeseries) >= timeseries.cumulative['price'].nbytes * len(timeseries.cumulative)
+
+    trend = timeseries.series(['price'], timeseries.select(), 'D').reset_index()
+    figure = px.line(trend.assign(Period=trend['Period'].astype(str)), x='Period', y='price')
+    assert estimate_size(figure) >= trend['price'].to_numpy().nbytes
+
+
+def test_byte_bound_evicts_rollups():
+    rollups = [build_rollup(frame(2000 * (i + 1))) for i in range(3)]
+    cache = LRUCache(max_bytes=estimate_size(rollups[2]) + estimate_size(rollups[1]))
+    for i, rollup in enumerate(rollups):
+        cache.put(i, rollup)
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['bytes'] <= cache.max_bytes
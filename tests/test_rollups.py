@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from aggregations import aggregate
+from rollups import build_rollup
+
+
+def frame(n):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        'email': [f'u{i}@x.id' for i in rng.integers(0, n // 5, n)],
+        'nama': 'Nama',
+        'enroll_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90, n), unit='D'),
+        'wilayah': rng.choice(['K1', 'K2', 'K3', None], n),
+        'category_name': rng.choice(['C1', 'C2'], n),
+        'voucher': rng.choice(['V1', 'V2'], n),
+        'title': [f'T{i}' for i in rng.integers(0, 30, n)],
+        'no_transaksi': np.arange(n).astype(str),
+        'price': rng.choice([1000.0, 2000.0, np.nan], n),
+        'progress': rng.choice([0.0, 50.0, 100.0], n),
+        'duration': 3600.0,
+    })
+    df.loc[::7, 'enroll_date'] = pd.NaT
+    return df
+
+
+def test_cube_matches_a_groupby():
+    df = frame(3000)
+    cube = build_rollup(df).cube
+    df['day'] = df['enroll_date'].dt.normalize()
+    dims = ['day', 'wilayah', 'category_name', 'voucher', 'title']
+    expected = df.groupby(dims, dropna=False).agg(rows=('email', 'size'), price=('price', 'sum')).reset_index()
+    got = cube[dims + ['rows', 'price']].sort_values(dims, na_position='last').reset_index(drop=True)
+    expected = expected.sort_values(dims, na_position='last').reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_rollup_without_days_gives_the_same_aggregates():
+    df = frame(3000)
+    by_day, flat = build_rollup(df), build_rollup(df, by_day=False)
+    assert len(flat.cube) < len(by_day.cube)
+    assert flat.select(date_range=('2024-02-01', '2024-02-02')).all()
+    a = aggregate(by_day, np.ones(len(by_day.cube), dtype=bool))
+    b = aggregate(flat, np.ones(len(flat.cube), dtype=bool))
+    assert a['kpis'].keys() == b['kpis'].keys()
+    assert all(np.isclose(a['kpis'][key], b['kpis'][key]) for key in a['kpis'])
+    for dim in ['wilayah', 'title', 'category_name', 'top_users']:
+        pd.testing.assert_frame_equal(a[dim], b[dim])
@@ -0,0 +1,130 @@
+import re
+
+import pandas as pd
+import pytest
+from gspread.utils import numericise_all
+
+from sheet_sync import SheetMirror
+
+
+class FakeWorksheet:
+    def __init__(self, title, rows):
+        self.title = title
+        self.rows = rows
+
+    @property
+    def row_count(self):
+        # Sheets keep spare blank rows below the data
+        return len(self.rows) + 50
+
+
+class FakeSpreadsheet:
+    # Local stand-in for a gspread Spreadsheet, answering like the Sheets API
+    def __init__(self, worksheets):
+        self.worksheets = {sheet.title: sheet for sheet in worksheets}
+        self.modified_time = "2026-01-01T00:00:00Z"
+        self.batch_gets = 0
+
+    def get_lastUpdateTime(self):
+        return self.modified_time
+
+    def worksheet(self, title):
+        return self.worksheets[title]
+
+    @property
+    def sheet1(self):
+        return next(iter(self.worksheets.values()))
+
+    def values_batch_get(self, ranges):
+        self.batch_gets += 1
+        value_ranges = []
+        for name in ranges:
+            title, first, last = re.match(r"'(.*)'!(\d+):(\d+)", name).groups()
+            rows = self.worksheets[title].rows[int(first) - 1:int(last)]
+            # The API leaves out trailing empty rows, and the values key of an empty range
+            while rows and not any(rows[-1]):
+                rows = rows[:-1]
+            value_ranges.append({'range': name, 'values': [list(row) for row in rows]} if rows else {'range': name})
+        return {'valueRanges': value_ranges}
+
+
+def get_all_records(rows):
+    # What Worksheet.get_all_records() returns for the same rows
+    while rows and not any(rows[-1]):
+        rows = rows[:-1]
+    width = max(len(row) for row in rows)
+    rows = [list(row) + [''] * (width - len(row)) for row in rows]
+    return pd.DataFrame([dict(zip(rows[0], numericise_all(row, False, ''))) for row in rows[1:]])
+
+
+@pytest.fixture
+def rows():
+    rows = [['email', 'wilayah', 'unit_kerja']] + [[f'e{i}@x.id', f'K{i % 5}', str(i)] for i in range(2500)]
+    rows[10] = []  # a blank row inside the data
+    rows[1500] = ['short@x.id', 'K1']  # a row missing its last cell
+    return rows
+
+
+def test_unchanged_modified_time_skips_the_download(rows):
+    spreadsheet = FakeSpreadsheet([FakeWorksheet('Sheet1', rows)])
+    mirror = SheetMirror(lambda: spreadsheet, block_rows=1000)
+
+    first = mirror.read()
+    pd.testing.assert_frame_equal(first, get_all_records(rows))
+    assert spreadsheet.batch_gets == 1
+
+    assert mirror.read() is first
+    assert spreadsheet.batch_gets == 1
+    assert mirror.stats['checks'] == 2 and mirror.stats['unchanged'] == 1
+
+
+def test_only_changed_blocks_are_reparsed(rows):
+    spreadsheet = FakeSpreadsheet([FakeWorksheet('Sheet1', rows)])
+    mirror = SheetMirror(lambda: spreadsheet, block_rows=1000)
+    mirror.read()
+    assert mirror.stats['blocks_parsed'] == 3
+
+    # One row edited in the third block of 1000 data rows
+    rows[2201] = ['changed@x.id', 'K9', '7']
+    spreadsheet.modified_time = "2026-01-02T00:00:00Z"
+    pd.testing.assert_frame_equal(mirror.read(), get_all_records(rows))
+    assert spreadsheet.batch_gets == 2
+    assert mirror.stats['blocks_parsed'] == 4 and mirror.stats['blocks_reused'] == 2
+
+
+def test_rows_appended_after_blank_rows(rows):
+    spreadsheet = FakeSpreadsheet([FakeWorksheet('Sheet1', rows)])
+    mirror = SheetMirror(lambda: spreadsheet, block_rows=1000)
+    mirror.read()
+
+    rows.extend([[], [], ['tail@x.id', 'K1', '1']])
+    spreadsheet.modified_time = "2026-01-03T00:00:00Z"
+    df = mirror.read()
+    pd.testing.assert_frame_equal(df, get_all_records(rows))
+    assert df['email'].iloc[-1] == 'tail@x.id'
+
+
+def test_header_change_reparses_every_block(rows):
+    spreadsheet = FakeSpreadsheet([FakeWorksheet('Sheet1', rows)])
+    mirror = SheetMirror(lambda: spreadsheet, block_rows=1000)
+    mirror.read()
+
+    rows[0] = ['email', 'wilayah', 'unit']
+    spreadsheet.modified_time = "2026-01-04T00:00:00Z"
+    pd.testing.assert_frame_equal(mirror.read(), get_all_records(rows))
+    assert mirror.stats['blocks_parsed'] == 6 and mirror.stats['blocks_reused'] == 0
+
+
+def test_seeded_frame_is_reused_until_the_sheet_changes(rows):
+    spreadsheet = FakeSpreadsheet([FakeWorksheet('creds', [['username', 'password'], ['a', 'x']])])
+    mirror = SheetMirror(lambda: spreadsheet, worksheet='creds')
+    persisted = pd.DataFrame({'username': ['a'], 'password': ['x']})
+    mirror.seed(persisted, spreadsheet.modified_time)
+
+    assert mirror.read() is persisted
+    assert spreadsheet.batch_gets == 0
+
+    spreadsheet.worksheets['creds'].rows.append(['b', 'y'])
+    spreadsheet.modified_time = "2026-01-05T00:00:00Z"
+    assert mirror.read()['username'].tolist() == ['a', 'b']
+    assert spreadsheet.batch_gets == 1 and mirror.meta() == {'modified_time': spreadsheet.modified_time}
@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+# Daily time series of df_combined, built once per snapshot. Rows are bucketed
+# by enroll day for every (wilayah, category, voucher) group, and each metric is
+# stored as one contiguous array of running totals per group, so the total of
+# any day range is the difference of two lookups. Weekly, monthly and custom
+# range trends only read the running totals at the bucket edges.
+GROUP_DIMENSIONS = ['wilayah', 'category_name', 'voucher']
+METRICS = ['rows', 'price', 'enrollments', 'completions', 'hours']
+FREQUENCIES = {'D': 'Daily', 'W': 'Weekly', 'M': 'Monthly'}
+
+# Monday of the week containing the epoch, so weeks run Monday to Sunday like to_period('W')
+_WEEK_ORIGIN = np.datetime64('1969-12-29', 'D')
+
+
+def _column(df, col):
+    return df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+
+
+def _numeric(df, col):
+    return pd.to_numeric(_column(df, col), errors='coerce').to_numpy(dtype=float)
+
+
+def build_timeseries(df):
+    days = pd.to_datetime(_column(df, 'enroll_date'), errors='coerce')
+    days = days.dt.tz_localize(None) if days.dt.tz is not None else days
+    days = days.to_numpy(dtype='datetime64[D]')
+    dated = ~np.isnat(days)
+    if not dated.any():
+        return TimeSeries(
+            np.array([], dtype='datetime64[D]'),
+            pd.DataFrame(columns=GROUP_DIMENSIONS),
+            {metric: np.zeros((0, 1)) for metric in METRICS},
+        )
+
+    # Rows without an enroll date have no place on the time axis
+    days = days[dated]
+    first, last = days.min(), days.max()
+    axis = np.arange(first, last + np.timedelta64(1, 'D'))
+    day_index = (days - first).astype(np.int64)
+
+    # One group id per distinct (wilayah, category, voucher), from a single packed integer key
+    key = np.zeros(dated.sum(), dtype=np.int64)
+    uniques = []
+    for dim in GROUP_DIMENSIONS:
+        dim_codes, dim_uniques = pd.factorize(_column(df, dim), use_na_sentinel=False)
+        key = key * len(dim_uniques) + dim_codes[dated]
+        uniques.append(dim_uniques)
+    group_keys, group_ids = np.unique(key, return_inverse=True)
+    groups = {}
+    for dim, dim_uniques in zip(reversed(GROUP_DIMENSIONS), reversed(uniques)):
+        group_keys, dim_codes = np.divmod(group_keys, len(dim_uniques))
+        groups[dim] = pd.Series(np.asarray(dim_uniques)[dim_codes])
+    groups = pd.DataFrame({dim: groups[dim] for dim in GROUP_DIMENSIONS})
+
+    # One cell per (group, day), flattened group-major
+    cells = group_ids.reshape(-1).astype(np.int64) * len(axis) + day_index
+    shape = (len(groups), len(axis))
+    progress = _numeric(df, 'progress')[dated]
+    values = {
+        'rows': None,
+        'price': np.nan_to_num(_numeric(df, 'price')[dated]),
+        'enrollments': _column(df, 'no_transaksi').notnull().to_numpy()[dated],
+        'completions': progress == 100,
+        'hours': np.nan_to_num(_numeric(df, 'duration')[dated]) / 3600,
+    }
+    cumulative = {}
+    for metric, weights in values.items():
+        daily = np.bincount(cells, weights=weights, minlength=shape[0] * shape[1]).reshape(shape)
+        # Leading zero column: the total of days [i, j) is cum[:, j] - cum[:, i]
+        cumulative[metric] = np.concatenate([np.zeros((shape[0], 1)), np.cumsum(daily, axis=1)], axis=1)
+    return TimeSeries(axis, groups, cumulative)
+
+
+def _bucket_ids(axis, freq):
+    if freq == 'D':
+        return np.arange(len(axis))
+    if freq == 'W':
+        return (axis - _WEEK_ORIGIN).astype(np.int64) // 7
+    if freq == 'M':
+        return axis.astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f"Unsupported frequency: {freq}")
+
+
+class TimeSeries:
+    def __init__(self, axis, groups, cumulative):
+        self.axis = axis
+        self.groups = groups
+        self.cumulative = cumulative
+        self._edges = {}
+
+    def nbytes(self):
+        # Memory held by the axis, groups and running totals, for the memo's byte bound
+        arrays = [self.axis] + list(self.cumulative.values()) + list(self._edges.values())
+        return int(self.groups.memory_usage(deep=False).sum()) + sum(array.nbytes for array in arrays)
+
+    def select(self, wilayah=None, categories=None, voucher=None):
+        # Boolean mask over groups, mirroring the sidebar filters
+        groups = self.groups
+        mask = np.ones(len(groups), dtype=bool)
+        if wilayah:
+            mask &= groups['wilayah'].isin(wilayah).to_numpy()
+        if categories:
+            mask &= groups['category_name'].isin(categories).to_numpy()
+        if voucher and voucher != "All":
+            mask &= (groups['voucher'] == voucher).to_numpy()
+        return mask
+
+    def day_span(self, date_range=None):
+        # Axis positions [lo, hi) covered by an inclusive date range
+        if not len(self.axis):
+            return 0, 0
+        if not date_range:
+            return 0, len(self.axis)
+        start = np.datetime64(pd.Timestamp(date_range[0]).date(), 'D')
+        end = np.datetime64(pd.Timestamp(date_range[1]).date(), 'D')
+        lo = int(np.searchsorted(self.axis, start, side='left'))
+        hi = int(np.searchsorted(self.axis, end, side='right'))
+        return lo, max(lo, hi)
+
+    def edges(self, freq):
+        # Axis positions where a new bucket starts, plus the end of the axis; once per freq
+        if freq not in self._edges:
+            ids = _bucket_ids(self.axis, freq)
+            starts = np.flatnonzero(np.diff(ids, prepend=ids[:1] - 1)) if len(ids) else np.array([], dtype=np.int64)
+            self._edges[freq] = np.append(starts, len(self.axis))
+        return self._edges[freq]
+
+    def total(self, metric, mask, date_range=None):
+        # Sum of a metric over the selected groups and day range
+        lo, hi = self.day_span(date_range)
+        rows = np.flatnonzero(mask)
+        cum = self.cumulative[metric]
+        return float(cum[rows, hi].sum() - cum[rows, lo].sum())
+
+    def series(self, metrics, mask, freq='W', date_range=None):
+        # Per-bucket totals of `metrics` over the selected groups and day range.
+        # Only buckets holding at least one selected row are returned, like a
+        # groupby over the filtered rows.
+        lo, hi = self.day_span(date_range)
+        edges = self.edges(freq)
+        edges = np.unique(np.clip(edges, lo, hi))
+        if hi <= lo:
+            return pd.DataFrame(columns=list(metrics), index=pd.PeriodIndex([], freq=freq, name='Period'))
+        cells = np.ix_(np.flatnonzero(mask), edges)
+        table = {}
+        for metric in ['rows'] + [m for m in metrics if m != 'rows']:
+            table[metric] = np.diff(self.cumulative[metric][cells].sum(axis=0))
+        periods = pd.DatetimeIndex(self.axis[edges[:-1]]).to_period(freq).rename('Period')
+        result = pd.DataFrame(table, index=periods)
+        return result[result['rows'] > 0][list(metrics)]